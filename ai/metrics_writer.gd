@@ -6,10 +6,29 @@ extends RefCounted
 func write_wandb_metrics(state: Dictionary, metrics_path: String) -> void:
     ## Write metrics to JSON for W&B Python bridge to read.
     ## state contains all scalar values needed for the metrics dict.
-    var file = FileAccess.open(metrics_path, FileAccess.WRITE)
-    if file:
-        file.store_string(JSON.stringify(state))
-        file.close()
+    ## Written to a temp file and renamed into place so readers never see a partial file.
+    var tmp_path := metrics_path + ".tmp"
+    var file = FileAccess.open(tmp_path, FileAccess.WRITE)
+    if not file:
+        return
+    file.store_string(JSON.stringify(state))
+    file.close()
+    DirAccess.rename_absolute(tmp_path, metrics_path)
+
+
+func append_metrics_line(state: Dictionary, stream_path: String) -> void:
+    ## Append metrics as one JSON line, so readers can tail every generation
+    ## instead of re-reading the latest snapshot and possibly skipping some.
+    var file: FileAccess
+    if FileAccess.file_exists(stream_path):
+        file = FileAccess.open(stream_path, FileAccess.READ_WRITE)
+    else:
+        file = FileAccess.open(stream_path, FileAccess.WRITE)
+    if not file:
+        return
+    file.seek_end()
+    file.store_line(JSON.stringify(state))
+    file.close()
 
 
 func update_map_elites_archive(archive: MapElites, evolution,
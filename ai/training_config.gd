@@ -29,6 +29,7 @@ var elite_injection_count: int = 5  # Number of elite genomes to inject
 
 # Worker/sweep
 var worker_id: String = ""
+var metrics_stream: bool = false  # Also append every metrics snapshot to metrics*.ndjson
 
 # Paths
 const BEST_NETWORK_PATH := "user://best_network.nn"
@@ -66,6 +67,7 @@ func load_from_sweep(fallback_pop_size: int = 150, fallback_max_gen: int = 100)
     map_elites_grid_size = maxi(1, int(_raw.get("map_elites_grid_size", map_elites_grid_size)))
     use_elite_reservoir = bool(_raw.get("use_elite_reservoir", use_elite_reservoir))
     elite_injection_count = maxi(0, int(_raw.get("elite_injection_count", elite_injection_count)))
+    metrics_stream = bool(_raw.get("metrics_stream", metrics_stream))
 
 
 func get_metrics_path() -> String:
@@ -74,6 +76,11 @@ func get_metrics_path() -> String:
     return METRICS_PATH
 
 
+func get_metrics_stream_path() -> String:
+    ## Append-only companion to get_metrics_path(): one JSON line per snapshot.
+    return get_metrics_path().get_basename() + ".ndjson"
+
+
 func get_population_path() -> String:
     if worker_id != "":
         return "user://population_%s.evo" % worker_id
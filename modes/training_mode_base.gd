@@ -38,7 +38,10 @@ func get_eval_states() -> Array:
 
 func write_metrics_for_wandb() -> void:
     ## Write W&B metrics JSON. Call at end of each generation and at training stop.
-    ctx.metrics_writer.write_wandb_metrics(_build_wandb_state(), ctx.config.get_metrics_path())
+    var state := _build_wandb_state()
+    ctx.metrics_writer.write_wandb_metrics(state, ctx.config.get_metrics_path())
+    if ctx.config.metrics_stream:
+        ctx.metrics_writer.append_metrics_line(state, ctx.config.get_metrics_stream_path())
 
 
 func _build_wandb_state() -> Dictionary:
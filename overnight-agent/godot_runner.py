@@ -0,0 +1,482 @@
+"""
+Shared Godot launch and metrics-monitoring helpers for the overnight-agent scripts.
+
+offline_evolve.py and overnight_evolve.py both drive headless Godot training runs
+through run_godot_training(); each passes an on_generation callback that builds its
+own W&B payload from the metrics Godot writes every generation.
+"""
+import json
+import os
+import select
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is optional; fall back to polling metrics.json
+    Observer = None
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json parses the same bytes
+    _json_loads = json.loads
+
+# Paths — configurable via environment variables for cross-platform support
+# macOS:   GODOT_PATH=/Applications/Godot.app/Contents/MacOS/Godot or /opt/homebrew/bin/godot
+# Linux:   GODOT_PATH=/usr/bin/godot
+# Windows: GODOT_PATH=C:/Godot/Godot.exe
+# Default to macOS homebrew path
+GODOT_PATH = os.environ.get("GODOT_PATH", "/opt/homebrew/bin/godot")
+PROJECT_PATH = os.environ.get("EVOLVE_PROJECT_PATH", os.path.expanduser("~/Projects/evolve"))
+
+
+def _default_godot_user_dir() -> str:
+    """Return the default Godot user data directory for the current platform."""
+    import platform
+    system = platform.system()
+    if system == "Darwin":
+        return os.path.expanduser("~/Library/Application Support/Godot/app_userdata/evolve")
+    elif system == "Windows":
+        return os.path.join(os.environ.get("APPDATA", ""), "Godot/app_userdata/evolve")
+    else:  # Linux and others
+        return os.path.expanduser("~/.local/share/godot/app_userdata/Evolve")
+
+
+GODOT_USER_DIR = os.environ.get("GODOT_USER_DIR", _default_godot_user_dir())
+
+# Metrics polling — used as a fallback when watchdog isn't installed
+POLL_INTERVAL = 2  # seconds between metrics.json reads without file events
+LIVENESS_INTERVAL = 10  # seconds between Godot liveness checks with file events
+
+STDERR_TAIL_LINES = 200  # stderr lines kept for crash reports
+
+
+def get_metrics_path(worker_id=None):
+    """Get metrics path, optionally with worker-specific suffix"""
+    if worker_id:
+        return os.path.join(GODOT_USER_DIR, f"metrics_{worker_id}.json")
+    return os.path.join(GODOT_USER_DIR, "metrics.json")
+
+
+def get_config_path(worker_id=None):
+    """Get config path, optionally with worker-specific suffix"""
+    if worker_id:
+        return os.path.join(GODOT_USER_DIR, f"sweep_config_{worker_id}.json")
+    return os.path.join(GODOT_USER_DIR, "sweep_config.json")
+
+
+def write_config_for_godot(config, worker_id=None):
+    """Write config so Godot can read it"""
+    config_path = get_config_path(worker_id)
+    os.makedirs(os.path.dirname(config_path), exist_ok=True)
+
+    config_dict = dict(config)
+    if worker_id:
+        config_dict['worker_id'] = worker_id
+
+    # Write beside the target and rename, so Godot never reads a truncated config
+    tmp_path = config_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(config_dict, f)
+    os.replace(tmp_path, config_path)
+
+
+def watch_metrics(paths, changed):
+    """Set `changed` whenever `paths` (one path, or a list of paths in one directory) is written.
+
+    Returns the observer, or None if watchdog is unavailable. Shared by the scripts/ tools.
+    """
+    if Observer is None:
+        return None
+
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    names = {os.path.basename(path) for path in paths}
+
+    class _MetricsHandler(FileSystemEventHandler):
+        def _check(self, event_path):
+            if os.path.basename(event_path) in names:
+                changed.set()
+
+        def on_created(self, event):
+            self._check(event.src_path)
+
+        def on_modified(self, event):
+            self._check(event.src_path)
+
+        def on_moved(self, event):
+            self._check(event.dest_path)
+
+    watch_dir = os.path.dirname(paths[0])
+    os.makedirs(watch_dir, exist_ok=True)
+    observer = Observer()
+    observer.schedule(_MetricsHandler(), watch_dir)
+    observer.start()
+    return observer
+
+
+def read_metrics_if_changed(path, last_stat):
+    """Parse the metrics file only if its (mtime, size) changed. Returns (data or None, stat key)"""
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    if stat_key == last_stat:
+        return None, last_stat
+    with open(path, 'rb') as f:
+        return _json_loads(f.read()), stat_key
+
+
+def _drain(pipe, tail):
+    """Read `pipe` to EOF so Godot never blocks on a full pipe buffer, keeping the last lines"""
+    for line in iter(pipe.readline, b''):
+        tail.append(line)
+    pipe.close()
+
+
+_pdeathsig_prefix = None  # argv prefix from _die_with_parent_prefix(), probed on first launch
+
+
+def _die_with_parent_prefix():
+    """Linux: `setpriv --pdeathsig TERM` so the kernel SIGTERMs Godot if the launching thread dies.
+
+    Done by exec'ing through setpriv rather than a preexec_fn, which would force a plain fork
+    while the watchdog/drain/W&B threads may hold locks. Empty where setpriv lacks the option.
+    """
+    global _pdeathsig_prefix
+    if _pdeathsig_prefix is None:
+        _pdeathsig_prefix = []
+        setpriv = shutil.which('setpriv') if sys.platform.startswith('linux') else None
+        if setpriv:
+            prefix = [setpriv, '--pdeathsig', 'TERM', '--']
+            try:
+                # util-linux < 2.33 has no --pdeathsig
+                if subprocess.run(prefix + ['true'], stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL).returncode == 0:
+                    _pdeathsig_prefix = prefix
+            except OSError:
+                pass
+    return _pdeathsig_prefix
+
+
+def _start_godot(cmd):
+    """Launch Godot in its own process group, with stdout discarded and stderr drained for crash logs"""
+    if os.name == 'posix':
+        # Godot's own session shields it from our terminal's signals, so without the pdeathsig
+        # prefix an agent killed by SIGKILL/OOM would leave an orphaned Godot holding the next slot
+        cmd = _die_with_parent_prefix() + cmd
+        group_kwargs = {'start_new_session': True}
+    else:
+        group_kwargs = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, **group_kwargs)
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_drain = threading.Thread(target=_drain, args=(proc.stderr, stderr_tail), daemon=True)
+    stderr_drain.start()
+    return proc, stderr_tail, stderr_drain
+
+
+def signal_godot_group(proc, force=False):
+    """SIGTERM (or SIGKILL if force) Godot's whole process group so any children it spawned die too"""
+    if os.name != 'posix':
+        if force:
+            proc.kill()
+        else:
+            proc.terminate()
+        return
+    try:
+        # start_new_session makes Godot the group leader, so its pid is the pgid
+        os.killpg(proc.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except ProcessLookupError:
+        pass  # Group already gone
+
+
+def wait_for_exit(proc, timeout):
+    """proc.wait(timeout) that sleeps on a pidfd (Linux) or kqueue (macOS) exit event instead of polling"""
+    if proc.poll() is not None:
+        return proc.returncode
+    try:
+        if hasattr(os, 'pidfd_open'):
+            pidfd = os.pidfd_open(proc.pid)
+            try:
+                exited, _, _ = select.select([pidfd], [], [], timeout)
+            finally:
+                os.close(pidfd)
+        elif hasattr(select, 'kqueue'):
+            kq = select.kqueue()
+            try:
+                exit_event = select.kevent(proc.pid, filter=select.KQ_FILTER_PROC,
+                                           flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                                           fflags=select.KQ_NOTE_EXIT)
+                exited = kq.control([exit_event], 1, timeout)
+            finally:
+                kq.close()
+        else:
+            return proc.wait(timeout=timeout)
+    except OSError:  # Kernel without pidfd (< 5.3), or the process is already gone
+        return proc.wait(timeout=timeout)
+    if not exited:
+        raise subprocess.TimeoutExpired(proc.args, timeout)
+    return proc.wait()
+
+
+def wake_on_exit(proc, event):
+    """Set `event` as soon as `proc` exits, so a loop waiting on metrics events also wakes on a crash.
+
+    waitid(WNOWAIT) blocks in the kernel without reaping, leaving the exit status for proc.poll().
+    Where waitid is missing (Windows), the caller's wait timeout still catches the exit.
+    """
+    if not hasattr(os, 'waitid'):
+        return
+
+    def _wait():
+        try:
+            os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        except ChildProcessError:
+            pass  # Already reaped
+        event.set()
+
+    threading.Thread(target=_wait, daemon=True).start()
+
+
+def _stop_godot(proc):
+    """Terminate Godot's process group gracefully, then force kill if needed"""
+    try:
+        signal_godot_group(proc)
+        wait_for_exit(proc, 5)
+    except subprocess.TimeoutExpired:
+        print("Godot didn't terminate gracefully, force killing...")
+        signal_godot_group(proc, force=True)
+        wait_for_exit(proc, 3)
+    except Exception as e:
+        print(f"Error during cleanup: {e}")
+        try:
+            proc.kill()
+        except Exception:
+            pass
+    # Sweep up any children that ignored SIGTERM after Godot itself exited
+    signal_godot_group(proc, force=True)
+
+
+class MetricSink:
+    """Append-only per-run metric log in SQLite (WAL), uploaded to W&B once the run ends
+
+    Rows are (run_id, gen, metric, value). log() has wandb.log's signature so a sink can
+    be passed as run_godot_training(log=sink.log).
+    """
+
+    def __init__(self, path, run_id):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.run_id = run_id
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS metrics (run_id TEXT, gen INTEGER, metric TEXT, value)')
+
+    def log(self, payload, step=None):
+        with self._conn:
+            self._conn.executemany(
+                'INSERT INTO metrics VALUES (?, ?, ?, ?)',
+                [(self.run_id, step, metric, value) for metric, value in payload.items()]
+            )
+
+    def payloads(self):
+        """Yield (gen, payload) in logging order, merging consecutive rows logged at the same gen"""
+        step, payload = None, {}
+        for gen, metric, value in self._conn.execute(
+                'SELECT gen, metric, value FROM metrics WHERE run_id = ? ORDER BY rowid', (self.run_id,)):
+            if payload and gen != step:
+                yield step, payload
+                payload = {}
+            step = gen
+            payload[metric] = value
+        if payload:
+            yield step, payload
+
+    def close(self):
+        self._conn.close()
+
+
+def run_godot_training(timeout_minutes=30, worker_id=None, visible=False, max_retries=2, max_generations=50,
+                       on_generation=None, log=None, should_stop=None, godot_path=None):
+    """Launch Godot in training mode (headless by default) and follow its metrics until it finishes.
+
+    on_generation(gen, data) returns the payload to log for each new generation; payloads and
+    crash/timeout events go to log(payload, step=gen), e.g. wandb.log. should_stop(gen, all_time_best)
+    returning True ends the run early.
+    """
+
+    metrics_path = get_metrics_path(worker_id)
+
+    # Clear old metrics
+    if os.path.exists(metrics_path):
+        os.remove(metrics_path)
+
+    # Build command
+    cmd = [godot_path or GODOT_PATH, "--path", PROJECT_PATH]
+
+    if not visible:
+        cmd.extend(["--headless", "--rendering-driver", "dummy"])
+
+    cmd.extend(["--", "--auto-train"])
+
+    # Add worker ID if running multiple instances
+    if worker_id:
+        cmd.append(f"--worker-id={worker_id}")
+
+    print(f"Starting Godot training (timeout: {timeout_minutes}m, worker: {worker_id or 'default'})...")
+
+    start_time = time.time()
+    last_gen = -1
+    best_fitness = 0
+    retries = 0
+    early_stopped = False
+
+    # Track metrics history for summary stats
+    fitness_history = []
+    avg_fitness_history = []
+
+    # Wake on metrics writes or Godot exiting instead of a fixed sleep; the timeout is a backstop
+    metrics_changed = threading.Event()
+    observer = watch_metrics(metrics_path, metrics_changed)
+    wait_interval = LIVENESS_INTERVAL if observer else POLL_INTERVAL
+
+    metrics_stat = None
+
+    proc, stderr_tail, stderr_drain = _start_godot(cmd)
+    wake_on_exit(proc, metrics_changed)
+
+    # Always tear Godot down, including when a sweep controller stops this run early
+    try:
+        while time.time() - start_time < timeout_minutes * 60:
+            # Check if process died unexpectedly
+            if proc.poll() is not None:
+                exit_code = proc.returncode
+                elapsed = time.time() - start_time
+                # If it died early (< 80% of expected time) and we have retries left, restart
+                if exit_code != 0 and retries < max_retries and elapsed < timeout_minutes * 60 * 0.8:
+                    retries += 1
+                    signal_godot_group(proc, force=True)  # Don't leave the crashed run's children behind
+                    stderr_drain.join(timeout=1)
+                    stderr_out = b''.join(stderr_tail).decode('utf-8', errors='replace')[-1000:]
+                    print(f"Godot crashed (exit {exit_code}, {elapsed:.0f}s in). Retry {retries}/{max_retries}...")
+                    if stderr_out.strip():
+                        print(f"  stderr tail: {stderr_out.strip()[-500:]}")
+                    if log is not None:
+                        log({
+                            "crash_retry": retries,
+                            "crash_exit_code": exit_code,
+                            "crash_elapsed_seconds": elapsed
+                        }, step=last_gen if last_gen >= 0 else 0)
+                    try:
+                        time.sleep(3)  # Brief cooldown before retry
+                    except (KeyboardInterrupt, SystemExit):
+                        break
+                    # Clear stale metrics
+                    if os.path.exists(metrics_path):
+                        os.remove(metrics_path)
+                    metrics_stat = None
+                    proc, stderr_tail, stderr_drain = _start_godot(cmd)
+                    wake_on_exit(proc, metrics_changed)
+                    continue
+                else:
+                    print(f"Godot process ended (exit {exit_code}, {retries} retries used)")
+                    break
+
+            # Read metrics
+            metrics_changed.clear()
+            try:
+                data, metrics_stat = read_metrics_if_changed(metrics_path, metrics_stat)
+                gen = data.get('generation', 0) if data is not None else last_gen
+                if gen > last_gen:
+                    last_gen = gen
+                    best_fitness = data.get('all_time_best', 0)
+                    avg_fitness = data.get('avg_fitness', 0)
+
+                    # Track history for summary
+                    fitness_history.append(data.get('best_fitness', 0))
+                    avg_fitness_history.append(avg_fitness)
+
+                    if on_generation and log is not None:
+                        log(on_generation(gen, data), step=gen)
+
+                    # Print progress with curriculum info if available
+                    curriculum_info = ""
+                    if data.get('curriculum_label'):
+                        curriculum_info = f" [{data['curriculum_label']}]"
+                    print(f"  Gen {gen}: best={best_fitness:.1f}, avg={avg_fitness:.1f}{curriculum_info}")
+
+                    # Check if training complete (hit max generations or stagnation)
+                    if max_generations and gen >= max_generations:
+                        print("Max generations reached")
+                        break
+
+                    # Check if Godot signaled training complete
+                    if data.get('training_complete', False):
+                        print("Training complete signal received")
+                        break
+
+                    # Check for stagnation (no improvement for too long)
+                    stagnation = data.get('generations_without_improvement', 0)
+                    stagnation_limit = data.get('stagnation_limit', 20)
+                    if stagnation >= stagnation_limit:
+                        print(f"Early stopping: No improvement for {stagnation} generations (limit: {stagnation_limit})")
+                        break
+
+                    if should_stop and should_stop(gen, best_fitness):
+                        print(f"Early stopping: all_time_best {best_fitness:.1f} below cutoff at gen {gen}")
+                        early_stopped = True
+                        break
+
+            except (json.JSONDecodeError, FileNotFoundError):
+                pass
+            except KeyboardInterrupt:
+                print("Worker interrupted during training loop, shutting down cleanly...")
+                break
+
+            try:
+                metrics_changed.wait(wait_interval)
+            except (KeyboardInterrupt, SystemExit):
+                print("Worker interrupted during sleep, shutting down cleanly...")
+                break
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+
+        _stop_godot(proc)
+
+        # Clean up worker-specific files
+        if worker_id:
+            for path in [metrics_path, get_config_path(worker_id)]:
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except Exception:
+                        pass
+
+    # Check why loop ended
+    elapsed = time.time() - start_time
+    if elapsed >= timeout_minutes * 60:
+        print(f"Training timeout reached ({timeout_minutes}m). Godot terminated.")
+        if log is not None:
+            log({"timeout_reached": True}, step=last_gen if last_gen >= 0 else 0)
+
+    # Log summary
+    print(f"Training complete. Generations: {last_gen}, Best fitness: {best_fitness:.1f}, Elapsed: {elapsed/60:.1f}m")
+
+    # Return metrics for summary
+    return {
+        'best_fitness': best_fitness,
+        'generations': last_gen,
+        'fitness_history': fitness_history,
+        'avg_fitness_history': avg_fitness_history,
+        'elapsed_minutes': elapsed / 60,
+        'timeout_reached': elapsed >= timeout_minutes * 60,
+        'early_stopped': early_stopped,
+    }
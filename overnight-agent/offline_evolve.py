@@ -5,19 +5,24 @@ Offline evolution training - runs locally without internet, syncs to W&B later.
 Runs a predefined schedule of hyperparameter configs, starting with small populations
 and progressively increasing complexity.
 """
-import json
+import multiprocessing
 import os
-import subprocess
+import statistics
+import threading
 import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 import wandb
 
-# Paths
-GODOT_PATH = "/Applications/Godot.app/Contents/MacOS/Godot"
-PROJECT_PATH = os.path.expanduser("~/Projects/evolve")
-GODOT_USER_DIR = os.path.expanduser("~/Library/Application Support/Godot/app_userdata/evolve")
+from godot_runner import MetricSink, run_godot_training, write_config_for_godot
+
+# Godot binary (project and user-data paths come from godot_runner)
+GODOT_PATH = os.environ.get("GODOT_PATH", "/Applications/Godot.app/Contents/MacOS/Godot")
+
+# One SQLite metrics file per run; the per-generation history lands here and goes to W&B at the end
+METRICS_DIR = os.environ.get("EVOLVE_OFFLINE_METRICS_DIR", "offline_metrics")
 
 # Progressive config schedule - starts small, increases complexity
 # Format: (population, hidden_size, elite_count, mutation_rate, crossover_rate, evals_per_individual)
@@ -54,265 +59,230 @@ FIXED_PARAMS = {
 }
 
 
-def get_metrics_path(worker_id=None):
-    """Get metrics path, optionally with worker-specific suffix"""
-    if worker_id:
-        return os.path.join(GODOT_USER_DIR, f"metrics_{worker_id}.json")
-    return os.path.join(GODOT_USER_DIR, "metrics.json")
-
-
-def get_config_path(worker_id=None):
-    """Get config path, optionally with worker-specific suffix"""
-    if worker_id:
-        return os.path.join(GODOT_USER_DIR, f"sweep_config_{worker_id}.json")
-    return os.path.join(GODOT_USER_DIR, "sweep_config.json")
-
-
-def write_config_for_godot(config, worker_id=None):
-    """Write config so Godot can read it"""
-    config_path = get_config_path(worker_id)
-    os.makedirs(os.path.dirname(config_path), exist_ok=True)
-
-    config_dict = dict(config)
-    if worker_id:
-        config_dict['worker_id'] = worker_id
-
-    with open(config_path, 'w') as f:
-        json.dump(config_dict, f)
-
-
-def run_godot_training(timeout_minutes=30, worker_id=None, visible=False, max_retries=2, config=None):
-    """Launch Godot in training mode"""
-
-    metrics_path = get_metrics_path(worker_id)
-
-    # Clear old metrics
-    if os.path.exists(metrics_path):
-        os.remove(metrics_path)
-
-    # Build command
-    cmd = [GODOT_PATH, "--path", PROJECT_PATH]
-
-    if not visible:
-        cmd.extend(["--headless", "--rendering-driver", "dummy"])
-
-    cmd.extend(["--", "--auto-train"])
-
-    # Add worker ID if running multiple instances
-    if worker_id:
-        cmd.append(f"--worker-id={worker_id}")
-
-    print(f"Starting Godot training (timeout: {timeout_minutes}m, worker: {worker_id or 'default'})...")
-
-    start_time = time.time()
-    last_gen = -1
-    best_fitness = 0
-    retries = 0
-
-    # Track metrics history for summary stats
-    fitness_history = []
-    avg_fitness_history = []
-
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    while time.time() - start_time < timeout_minutes * 60:
-        # Check if process died unexpectedly
-        if proc.poll() is not None:
-            exit_code = proc.returncode
-            elapsed = time.time() - start_time
-            # If it died early (< 80% of expected time) and we have retries left, restart
-            if exit_code != 0 and retries < max_retries and elapsed < timeout_minutes * 60 * 0.8:
-                retries += 1
-                stderr_out = proc.stderr.read().decode('utf-8', errors='replace')[-500:]
-                print(f"Godot crashed (exit {exit_code}, {elapsed:.0f}s in). Retry {retries}/{max_retries}...")
-                if stderr_out.strip():
-                    print(f"  stderr: {stderr_out.strip()[:200]}")
-                wandb.log({"crash_retry": retries}, step=last_gen if last_gen >= 0 else 0)
-                time.sleep(3)  # Brief cooldown before retry
-                # Clear stale metrics
-                if os.path.exists(metrics_path):
-                    os.remove(metrics_path)
-                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                continue
-            else:
-                print(f"Godot process ended (exit {exit_code}, {retries} retries used)")
-                break
-
-        # Read metrics
-        try:
-            with open(metrics_path) as f:
-                data = json.load(f)
-
-            gen = data.get('generation', 0)
-            if gen > last_gen:
-                last_gen = gen
-                best_fitness = data.get('all_time_best', 0)
-                current_best = data.get('best_fitness', 0)
-                avg_fitness = data.get('avg_fitness', 0)
-
-                # Track history for summary
-                fitness_history.append(current_best)
-                avg_fitness_history.append(avg_fitness)
-
-                # Log all available metrics with explicit step
-                wandb.log({
-                    'generation': gen,
-                    'best_fitness': current_best,
-                    'avg_fitness': avg_fitness,
-                    'min_fitness': data.get('min_fitness', 0),
-                    'all_time_best': best_fitness,
-                    'stagnation': data.get('generations_without_improvement', 0),
-                    # Score breakdown (if available)
-                    'avg_kill_score': data.get('avg_kill_score', 0),
-                    'avg_powerup_score': data.get('avg_powerup_score', 0),
-                    'avg_survival_score': data.get('avg_survival_score', 0),
-                }, step=gen)
-
-                print(f"  Gen {gen}: best={best_fitness:.1f}, avg={avg_fitness:.1f}")
-
-                # Check if training complete (hit max generations or stagnation)
-                if config and gen >= config.get('max_generations', 50):
-                    print("Max generations reached")
-                    break
-
-                # Check if Godot signaled training complete
-                if data.get('training_complete', False):
-                    print("Training complete signal received")
-                    break
-
-                # Check for stagnation (no improvement for too long)
-                stagnation = data.get('generations_without_improvement', 0)
-                stagnation_limit = data.get('stagnation_limit', 20)
-                if stagnation >= stagnation_limit:
-                    print(f"Early stopping: No improvement for {stagnation} generations (limit: {stagnation_limit})")
-                    break
-
-        except (json.JSONDecodeError, FileNotFoundError):
-            pass
-
-        time.sleep(2)
-
-    # Clean up
-    proc.terminate()
-    proc.wait(timeout=5)
-
-    # Clean up worker-specific files
-    if worker_id:
-        for path in [metrics_path, get_config_path(worker_id)]:
-            if os.path.exists(path):
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
-
-    # Return metrics for summary
-    return {
-        'best_fitness': best_fitness,
-        'generations': last_gen,
-        'fitness_history': fitness_history,
-        'avg_fitness_history': avg_fitness_history,
+def _prepare_config(pop_size, hidden_size, elite_count, mutation_rate, crossover_rate, evals):
+    """Expand a CONFIG_SCHEDULE entry into (full Godot config, timeout in minutes)"""
+    config = {
+        'population_size': pop_size,
+        'hidden_size': hidden_size,
+        'elite_count': elite_count,
+        'mutation_rate': mutation_rate,
+        'crossover_rate': crossover_rate,
+        'evals_per_individual': evals,
+        **FIXED_PARAMS
     }
+    # Timeout scales with population, evals, and network size
+    # Larger networks are significantly slower (H48 is ~18x slower than H32)
+    network_factor = (hidden_size / 32.0) ** 1.5  # Quadratic-ish scaling for network size
+    timeout_minutes = int(30 + pop_size * 0.6 * evals * network_factor)
+    return config, timeout_minutes
 
 
-def run_offline_training_schedule(visible=False, start_from=0, limit=None):
-    """Run through the predefined config schedule in offline mode"""
+# CONFIG_SCHEDULE expanded once at import: (config, timeout_minutes) per entry
+PREPARED_SCHEDULE = tuple(_prepare_config(*entry) for entry in CONFIG_SCHEDULE)
 
-    # Set wandb to offline mode
-    os.environ['WANDB_MODE'] = 'offline'
+# Approximate peak memory of one headless Godot instance at parallel_count=10 (GB)
+GODOT_MEMORY_GB = 4
 
-    print("="*80)
-    print("OFFLINE TRAINING MODE")
-    print("="*80)
-    print(f"Total configs in schedule: {len(CONFIG_SCHEDULE)}")
-    if limit:
-        print(f"Limited to first {limit} configs")
-    print(f"Starting from config #{start_from}")
-    print(f"Mode: {'VISIBLE' if visible else 'HEADLESS'}")
-    print(f"\nRuns will be saved locally to: {os.getcwd()}/wandb/")
-    print("To sync later: wandb sync wandb/offline-run-*")
-    print("="*80)
-    print()
+# ASHA early stopping (--asha): at each rung generation a config only continues if its
+# all_time_best is in the top 1/ASHA_REDUCTION_FACTOR of configs that reached that rung
+ASHA_GRACE_PERIOD = 10
+ASHA_REDUCTION_FACTOR = 3
 
-    # Determine which configs to run
-    configs_to_run = CONFIG_SCHEDULE[start_from:start_from+limit] if limit else CONFIG_SCHEDULE[start_from:]
-
-    for idx, (pop_size, hidden_size, elite_count, mutation_rate, crossover_rate, evals) in enumerate(configs_to_run, start=start_from):
-        config_num = idx + 1
-        total_configs = len(CONFIG_SCHEDULE)
-
-        print(f"\n{'='*80}")
-        print(f"CONFIG {config_num}/{total_configs} - Population: {pop_size}, Hidden: {hidden_size}")
-        print(f"{'='*80}")
-
-        # Build full config
-        config = {
-            'population_size': pop_size,
-            'hidden_size': hidden_size,
-            'elite_count': elite_count,
-            'mutation_rate': mutation_rate,
-            'crossover_rate': crossover_rate,
-            'evals_per_individual': evals,
-            **FIXED_PARAMS
-        }
-
-        # Print config
-        print("\nHyperparameters:")
-        for key, value in sorted(config.items()):
-            print(f"  {key}: {value}")
-
-        # Generate unique worker ID for this run
-        worker_id = str(uuid.uuid4())[:8]
-
-        # Initialize wandb run (offline)
-        run = wandb.init(
-            project='evolve-neuroevolution-offline',
-            config=config,
-            name=f"offline-pop{pop_size}-h{hidden_size}-run{config_num}",
-            tags=['offline', f'pop_{pop_size}', f'phase_{(config_num-1)//4 + 1}']
-        )
 
-        # Write config for Godot
-        write_config_for_godot(config, worker_id)
+def _offline_log_data(gen, data):
+    """Build the per-generation W&B payload from Godot's metrics dict"""
+    return {
+        'generation': gen,
+        'best_fitness': data.get('best_fitness', 0),
+        'avg_fitness': data.get('avg_fitness', 0),
+        'min_fitness': data.get('min_fitness', 0),
+        'all_time_best': data.get('all_time_best', 0),
+        'stagnation': data.get('generations_without_improvement', 0),
+        # Score breakdown (if available)
+        'avg_kill_score': data.get('avg_kill_score', 0),
+        'avg_powerup_score': data.get('avg_powerup_score', 0),
+        'avg_survival_score': data.get('avg_survival_score', 0),
+    }
 
-        # Calculate timeout based on population, evals, and network size
-        # Larger networks are significantly slower (H48 is ~18x slower than H32)
-        network_factor = (hidden_size / 32.0) ** 1.5  # Quadratic-ish scaling for network size
-        timeout_minutes = int(30 + pop_size * 0.6 * evals * network_factor)
-        print(f"\nTimeout: {timeout_minutes} minutes (network_factor: {network_factor:.2f})")
-        print(f"Starting training at {datetime.now().strftime('%H:%M:%S')}...")
 
-        # Run training
+def _asha_rungs(max_t, grace_period=ASHA_GRACE_PERIOD, reduction_factor=ASHA_REDUCTION_FACTOR):
+    """Rung generations grace_period * eta^k below max_t, e.g. [10, 30] for max_t=50, eta=3"""
+    rungs = []
+    rung = grace_period
+    while rung < max_t:
+        rungs.append(rung)
+        rung *= reduction_factor
+    return rungs
+
+
+class _AshaStopper:
+    """Per-config ASHA stopping rule over rung records shared by every config in the schedule.
+
+    rung_records maps rung generation -> list of all_time_best values recorded there; it may
+    hold multiprocessing.Manager lists (with a Manager lock) when configs run in parallel.
+    """
+
+    def __init__(self, rung_records, lock=None, reduction_factor=ASHA_REDUCTION_FACTOR):
+        self.rung_records = rung_records
+        self.lock = lock or threading.Lock()
+        self.reduction_factor = reduction_factor
+        self._pending_rungs = sorted(rung_records)
+
+    def __call__(self, gen, value):
+        """Record value at each rung gen has reached; True if it falls below a rung's cutoff"""
+        stop = False
+        while self._pending_rungs and gen >= self._pending_rungs[0]:
+            rung = self._pending_rungs.pop(0)
+            with self.lock:
+                self.rung_records[rung].append(value)
+                recorded = list(self.rung_records[rung])
+            if len(recorded) >= 2:
+                cutoff = statistics.quantiles(recorded, n=self.reduction_factor, method='inclusive')[-1]
+                stop = stop or value < cutoff
+        return stop
+
+
+def _max_parallel_workers():
+    """Cap concurrent Godot instances by CPU cores and physical memory"""
+    cpu_limit = max(1, (os.cpu_count() or 2) // 2)
+    try:
+        total_gb = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3
+    except (AttributeError, ValueError, OSError):  # No sysconf on Windows
+        return cpu_limit
+    return max(1, min(cpu_limit, int(total_gb // GODOT_MEMORY_GB)))
+
+
+def _run_one_config(idx, prepared, visible=False, rung_records=None, rung_lock=None):
+    """Run one PREPARED_SCHEDULE entry as its own offline wandb run. Safe to call from a worker process."""
+    config, timeout_minutes = prepared
+    pop_size = config['population_size']
+    hidden_size = config['hidden_size']
+    config_num = idx + 1
+    total_configs = len(PREPARED_SCHEDULE)
+
+    print(f"\n{'='*80}")
+    print(f"CONFIG {config_num}/{total_configs} - Population: {pop_size}, Hidden: {hidden_size}")
+    print(f"{'='*80}")
+
+    # Print config
+    print("\nHyperparameters:")
+    for key, value in sorted(config.items()):
+        print(f"  {key}: {value}")
+
+    # Generate unique worker ID for this run
+    worker_id = str(uuid.uuid4())[:8]
+
+    run_name = f"offline-pop{pop_size}-h{hidden_size}-run{config_num}"
+
+    # Per-generation metrics go to a local SQLite sink; W&B sees one upload at the end
+    sink = MetricSink(os.path.join(METRICS_DIR, f"{run_name}-{worker_id}.db"), run_id=worker_id)
+
+    # Write config for Godot
+    write_config_for_godot(config, worker_id)
+
+    print(f"\nTimeout: {timeout_minutes} minutes")
+    print(f"Starting training at {datetime.now().strftime('%H:%M:%S')}...")
+
+    # Run training
+    try:
         results = run_godot_training(
             timeout_minutes=timeout_minutes,
             worker_id=worker_id,
             visible=visible,
-            config=config
+            max_generations=config['max_generations'],
+            on_generation=_offline_log_data,
+            log=sink.log,
+            should_stop=_AshaStopper(rung_records, rung_lock) if rung_records is not None else None,
+            godot_path=GODOT_PATH
         )
+        history = list(sink.payloads())
+    finally:
+        sink.close()
+
+    # One wandb run per config, replaying the history step by step so it keeps its curves
+    wandb.init(
+        project='evolve-neuroevolution-offline',
+        config=config,
+        name=run_name,
+        tags=['offline', f'pop_{pop_size}', f'phase_{(config_num-1)//4 + 1}']
+    )
+    for step, payload in history:
+        wandb.log(payload, step=step)
 
-        # Log summary statistics
-        wandb.summary['final_best_fitness'] = results['best_fitness']
-        wandb.summary['total_generations'] = results['generations']
+    # Log summary metrics
+    wandb.summary['final_best_fitness'] = results['best_fitness']
+    wandb.summary['total_generations'] = results['generations']
+    wandb.summary['asha_stopped'] = results['early_stopped']
 
-        if results['fitness_history']:
-            wandb.summary['mean_best_fitness'] = sum(results['fitness_history']) / len(results['fitness_history'])
-            wandb.summary['max_best_fitness'] = max(results['fitness_history'])
+    if results['fitness_history']:
+        wandb.summary['mean_best_fitness'] = sum(results['fitness_history']) / len(results['fitness_history'])
+        wandb.summary['max_best_fitness'] = max(results['fitness_history'])
 
-        if results['avg_fitness_history']:
-            wandb.summary['mean_avg_fitness'] = sum(results['avg_fitness_history']) / len(results['avg_fitness_history'])
-            wandb.summary['final_avg_fitness'] = results['avg_fitness_history'][-1]
+    if results['avg_fitness_history']:
+        wandb.summary['mean_avg_fitness'] = sum(results['avg_fitness_history']) / len(results['avg_fitness_history'])
+        wandb.summary['final_avg_fitness'] = results['avg_fitness_history'][-1]
 
-        # Finish run
-        wandb.finish()
+    # Finish run
+    wandb.finish()
 
-        print(f"\n✓ Config {config_num} complete!")
-        print(f"  Best fitness: {results['best_fitness']:.1f}")
-        print(f"  Generations: {results['generations']}")
-        print(f"  Finished at {datetime.now().strftime('%H:%M:%S')}")
+    print(f"\n✓ Config {config_num} complete!")
+    print(f"  Best fitness: {results['best_fitness']:.1f}")
+    print(f"  Generations: {results['generations']}")
+    print(f"  Finished at {datetime.now().strftime('%H:%M:%S')}")
 
-        # Brief pause between runs
-        if idx < len(configs_to_run) - 1:
-            print("\nPausing 5 seconds before next config...\n")
-            time.sleep(5)
+    return results
+
+
+def run_offline_training_schedule(visible=False, start_from=0, limit=None, parallel=1, asha=False):
+    """Run through the predefined config schedule in offline mode"""
+
+    # Set wandb to offline mode (inherited by worker processes)
+    os.environ['WANDB_MODE'] = 'offline'
+
+    max_workers = _max_parallel_workers()
+    if parallel > max_workers:
+        print(f"Requested {parallel} parallel workers; capping at {max_workers} for this machine")
+        parallel = max_workers
+
+    print("="*80)
+    print("OFFLINE TRAINING MODE")
+    print("="*80)
+    print(f"Total configs in schedule: {len(PREPARED_SCHEDULE)}")
+    if limit:
+        print(f"Limited to first {limit} configs")
+    print(f"Starting from config #{start_from}")
+    print(f"Mode: {'VISIBLE' if visible else 'HEADLESS'}")
+    print(f"Parallel Godot workers: {parallel}")
+    rungs = _asha_rungs(FIXED_PARAMS['max_generations']) if asha else []
+    if asha:
+        print(f"ASHA early stopping: rungs at generations {rungs}, keep top 1/{ASHA_REDUCTION_FACTOR}")
+    print(f"\nPer-generation metrics: {os.path.abspath(METRICS_DIR)}/")
+    print(f"Runs will be saved locally to: {os.getcwd()}/wandb/")
+    print("To sync later: wandb sync wandb/offline-run-*")
+    print("="*80)
+    print()
+
+    # Determine which configs to run
+    configs_to_run = PREPARED_SCHEDULE[start_from:start_from+limit] if limit else PREPARED_SCHEDULE[start_from:]
+
+    if parallel > 1:
+        # Each config gets its own worker_id, so metrics/config files never collide
+        n = len(configs_to_run)
+        indices = range(start_from, start_from + n)
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=parallel) as executor:
+            rung_records = {rung: manager.list() for rung in rungs} if asha else None
+            rung_lock = manager.Lock() if asha else None
+            list(executor.map(_run_one_config, indices, configs_to_run,
+                              [visible] * n, [rung_records] * n, [rung_lock] * n))
+    else:
+        rung_records = {rung: [] for rung in rungs} if asha else None
+        for idx, prepared in enumerate(configs_to_run, start=start_from):
+            _run_one_config(idx, prepared, visible, rung_records)
+
+            # Brief pause between runs
+            if idx < start_from + len(configs_to_run) - 1:
+                print("\nPausing 5 seconds before next config...\n")
+                time.sleep(5)
 
     print("\n" + "="*80)
     print("ALL CONFIGS COMPLETE!")
@@ -331,10 +301,16 @@ if __name__ == '__main__':
     parser.add_argument('--visible', action='store_true', help='Run with Godot window visible (default: headless)')
     parser.add_argument('--start-from', type=int, default=0, help='Start from config N (0-indexed)')
     parser.add_argument('--limit', type=int, default=None, help='Only run N configs from schedule')
+    parser.add_argument('--parallel', type=int, default=1,
+                        help='Run N configs concurrently in separate Godot instances (default: 1)')
+    parser.add_argument('--asha', action='store_true',
+                        help='Stop configs early when they fall behind earlier configs at rung generations')
     args = parser.parse_args()
 
     run_offline_training_schedule(
         visible=args.visible,
         start_from=args.start_from,
-        limit=args.limit
+        limit=args.limit,
+        parallel=args.parallel,
+        asha=args.asha
     )
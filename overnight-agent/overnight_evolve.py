@@ -1,13 +1,11 @@
 # overnight_evolve.py
-import json
-import os
-import subprocess
 import sys
-import time
 import uuid
 
 import wandb
 
+from godot_runner import run_godot_training, write_config_for_godot
+
 # Enable line buffering for real-time logging (critical for nohup!)
 sys.stdout.reconfigure(line_buffering=True)
 sys.stderr.reconfigure(line_buffering=True)
@@ -15,6 +13,8 @@ sys.stderr.reconfigure(line_buffering=True)
 sweep_config = {
     'method': 'bayes',
     'metric': {'name': 'all_time_best', 'goal': 'maximize'},
+    # Hyperband pruning: stop runs whose all_time_best trails the sweep at gen 10, 30, ...
+    'early_terminate': {'type': 'hyperband', 'min_iter': 10, 'eta': 3},
     'parameters': {
         # Population
         'population_size': {'values': [50, 100, 150, 200]},
@@ -43,30 +43,6 @@ sweep_config = {
     }
 }
 
-# Paths — configurable via environment variables for cross-platform support
-# macOS:   GODOT_PATH=/Applications/Godot.app/Contents/MacOS/Godot
-# Linux:   GODOT_PATH=/usr/bin/godot
-# macOS:   GODOT_PATH=/Applications/Godot.app/Contents/MacOS/Godot or /opt/homebrew/bin/godot
-# Windows: GODOT_PATH=C:/Godot/Godot.exe
-# Default to macOS homebrew path
-GODOT_PATH = os.environ.get("GODOT_PATH", "/opt/homebrew/bin/godot")
-PROJECT_PATH = os.environ.get("EVOLVE_PROJECT_PATH", os.path.expanduser("~/Projects/evolve"))
-
-
-def _default_godot_user_dir() -> str:
-    """Return the default Godot user data directory for the current platform."""
-    import platform
-    system = platform.system()
-    if system == "Darwin":
-        return os.path.expanduser("~/Library/Application Support/Godot/app_userdata/evolve")
-    elif system == "Windows":
-        return os.path.join(os.environ.get("APPDATA", ""), "Godot/app_userdata/evolve")
-    else:  # Linux and others
-        return os.path.expanduser("~/.local/share/godot/app_userdata/Evolve")
-
-
-GODOT_USER_DIR = os.environ.get("GODOT_USER_DIR", _default_godot_user_dir())
-
 # Generate unique worker ID for this process
 WORKER_ID = str(uuid.uuid4())[:8]
 
@@ -74,237 +50,53 @@ WORKER_ID = str(uuid.uuid4())[:8]
 VISIBLE_MODE = False
 
 
-def get_metrics_path(worker_id=None):
-    """Get metrics path, optionally with worker-specific suffix"""
-    if worker_id:
-        return os.path.join(GODOT_USER_DIR, f"metrics_{worker_id}.json")
-    return os.path.join(GODOT_USER_DIR, "metrics.json")
-
-
-def get_config_path(worker_id=None):
-    """Get config path, optionally with worker-specific suffix"""
-    if worker_id:
-        return os.path.join(GODOT_USER_DIR, f"sweep_config_{worker_id}.json")
-    return os.path.join(GODOT_USER_DIR, "sweep_config.json")
-
-
-def write_config_for_godot(config, worker_id=None):
-    """Write sweep config so Godot can read it"""
-    config_path = get_config_path(worker_id)
-    os.makedirs(os.path.dirname(config_path), exist_ok=True)
-
-    config_dict = dict(config)
-    if worker_id:
-        config_dict['worker_id'] = worker_id
-
-    with open(config_path, 'w') as f:
-        json.dump(config_dict, f)
-
-
-def run_godot_training(timeout_minutes=30, worker_id=None, visible=False, max_retries=2):
-    """Launch Godot in training mode (headless by default, or with window if visible=True)"""
-
-    metrics_path = get_metrics_path(worker_id)
-
-    # Clear old metrics
-    if os.path.exists(metrics_path):
-        os.remove(metrics_path)
-
-    # Build command
-    cmd = [GODOT_PATH, "--path", PROJECT_PATH]
-
-    if not visible:
-        cmd.append("--headless")
-
-    cmd.extend(["--", "--auto-train"])
-
-    # Add worker ID if running multiple instances
-    if worker_id:
-        cmd.append(f"--worker-id={worker_id}")
-
-    print(f"Starting Godot training (timeout: {timeout_minutes}m, worker: {worker_id or 'default'})...")
-
-    start_time = time.time()
-    last_gen = -1
-    best_fitness = 0
-    retries = 0
-
-    # Track metrics history for summary stats
-    fitness_history = []
-    avg_fitness_history = []
-
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    while time.time() - start_time < timeout_minutes * 60:
-        # Check if process died unexpectedly
-        if proc.poll() is not None:
-            exit_code = proc.returncode
-            elapsed = time.time() - start_time
-            # If it died early (< 80% of expected time) and we have retries left, restart
-            if exit_code != 0 and retries < max_retries and elapsed < timeout_minutes * 60 * 0.8:
-                retries += 1
-                stderr_out = proc.stderr.read().decode('utf-8', errors='replace')[-1000:]
-                print(f"Godot crashed (exit {exit_code}, {elapsed:.0f}s in). Retry {retries}/{max_retries}...")
-                if stderr_out.strip():
-                    print(f"  stderr tail: {stderr_out.strip()[-500:]}")
-                wandb.log({
-                    "crash_retry": retries,
-                    "crash_exit_code": exit_code,
-                    "crash_elapsed_seconds": elapsed
-                }, step=last_gen if last_gen >= 0 else 0)
-                try:
-                    time.sleep(3)  # Brief cooldown before retry
-                except (KeyboardInterrupt, SystemExit):
-                    break
-                # Clear stale metrics
-                if os.path.exists(metrics_path):
-                    os.remove(metrics_path)
-                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                continue
-            else:
-                print(f"Godot process ended (exit {exit_code}, {retries} retries used)")
-                break
-
-        # Read metrics
-        try:
-            with open(metrics_path) as f:
-                data = json.load(f)
-
-            gen = data.get('generation', 0)
-            if gen > last_gen:
-                last_gen = gen
-                best_fitness = data.get('all_time_best', 0)
-                current_best = data.get('best_fitness', 0)
-                avg_fitness = data.get('avg_fitness', 0)
-
-                # Track history for summary
-                fitness_history.append(current_best)
-                avg_fitness_history.append(avg_fitness)
-
-                # Log all available metrics with explicit step
-                log_data = {
-                    'generation': gen,
-                    'best_fitness': current_best,
-                    'avg_fitness': avg_fitness,
-                    'min_fitness': data.get('min_fitness', 0),
-                    'all_time_best': best_fitness,
-                    'stagnation': data.get('generations_without_improvement', 0),
-                    # Score breakdown
-                    'avg_kill_score': data.get('avg_kill_score', 0),
-                    'avg_powerup_score': data.get('avg_powerup_score', 0),
-                    'avg_survival_score': data.get('avg_survival_score', 0),
-                    # Config (should be constant but useful for verification)
-                    'population_size': data.get('population_size', 0),
-                    'evals_per_individual': data.get('evals_per_individual', 1),
-                    'time_scale': data.get('time_scale', 1.0),
-                    # Curriculum learning
-                    'curriculum_stage': data.get('curriculum_stage', 0),
-                    'curriculum_label': data.get('curriculum_label', ''),
-                    # NSGA-II (multi-objective)
-                    'use_nsga2': data.get('use_nsga2', False),
-                    'pareto_front_size': data.get('pareto_front_size', 0),
-                    'hypervolume': data.get('hypervolume', 0.0),
-                    # NEAT (topology evolution)
-                    'use_neat': data.get('use_neat', False),
-                    'neat_species_count': data.get('neat_species_count', 0),
-                    'neat_compatibility_threshold': data.get('neat_compatibility_threshold', 0.0),
-                    # MAP-Elites (quality-diversity)
-                    'use_map_elites': data.get('use_map_elites', False),
-                    'map_elites_occupied': data.get('map_elites_occupied', 0),
-                    'map_elites_coverage': data.get('map_elites_coverage', 0.0),
-                    'map_elites_best': data.get('map_elites_best', 0.0),
-                }
-
-                # Add co-evolution metrics if present
-                if data.get('coevolution', False):
-                    log_data['coevolution'] = True
-                    log_data['enemy_best_fitness'] = data.get('enemy_best_fitness', 0)
-                    log_data['enemy_all_time_best'] = data.get('enemy_all_time_best', 0)
-                    log_data['enemy_avg_fitness'] = data.get('enemy_avg_fitness', 0)
-                    log_data['enemy_min_fitness'] = data.get('enemy_min_fitness', 0)
-                    log_data['hof_size'] = data.get('hof_size', 0)
-                    log_data['is_hof_generation'] = data.get('is_hof_generation', False)
-
-                wandb.log(log_data, step=gen)
-
-                # Print progress with curriculum info if available
-                curriculum_info = ""
-                if log_data.get('curriculum_label'):
-                    curriculum_info = f" [{log_data['curriculum_label']}]"
-                print(f"  Gen {gen}: best={best_fitness:.1f}, avg={avg_fitness:.1f}{curriculum_info}")
-
-                # Check if training complete (hit max generations or stagnation)
-                if gen >= wandb.config.max_generations:
-                    print("Max generations reached")
-                    break
-
-                # Check if Godot signaled training complete
-                if data.get('training_complete', False):
-                    print("Training complete signal received")
-                    break
-
-                # Check for stagnation (no improvement for too long)
-                stagnation = data.get('generations_without_improvement', 0)
-                stagnation_limit = data.get('stagnation_limit', 20)
-                if stagnation >= stagnation_limit:
-                    print(f"Early stopping: No improvement for {stagnation} generations (limit: {stagnation_limit})")
-                    break
-
-        except (json.JSONDecodeError, FileNotFoundError):
-            pass
-        except KeyboardInterrupt:
-            print("Worker interrupted during training loop, shutting down cleanly...")
-            break
-
-        try:
-            time.sleep(2)
-        except (KeyboardInterrupt, SystemExit):
-            print("Worker interrupted during sleep, shutting down cleanly...")
-            break
-
-    # Check why loop ended
-    elapsed = time.time() - start_time
-    if elapsed >= timeout_minutes * 60:
-        print(f"Training timeout reached ({timeout_minutes}m). Terminating...")
-        wandb.log({"timeout_reached": True}, step=last_gen if last_gen >= 0 else 0)
-
-    # Clean up - terminate gracefully, then force kill if needed
-    try:
-        proc.terminate()
-        proc.wait(timeout=5)
-    except subprocess.TimeoutExpired:
-        print("Godot didn't terminate gracefully, force killing...")
-        proc.kill()
-        proc.wait(timeout=3)
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
-        try:
-            proc.kill()
-        except Exception:
-            pass
-
-    # Clean up worker-specific files
-    if worker_id:
-        for path in [metrics_path, get_config_path(worker_id)]:
-            if os.path.exists(path):
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
-
-    # Log summary
-    print(f"Training complete. Generations: {last_gen}, Best fitness: {best_fitness:.1f}, Elapsed: {elapsed/60:.1f}m")
-
-    # Return metrics for summary
-    return {
-        'best_fitness': best_fitness,
-        'generations': last_gen,
-        'fitness_history': fitness_history,
-        'avg_fitness_history': avg_fitness_history,
-        'elapsed_minutes': elapsed / 60,
-        'timeout_reached': elapsed >= timeout_minutes * 60,
+def _sweep_log_data(gen, data):
+    """Build the per-generation W&B payload from Godot's metrics dict"""
+    log_data = {
+        'generation': gen,
+        'best_fitness': data.get('best_fitness', 0),
+        'avg_fitness': data.get('avg_fitness', 0),
+        'min_fitness': data.get('min_fitness', 0),
+        'all_time_best': data.get('all_time_best', 0),
+        'stagnation': data.get('generations_without_improvement', 0),
+        # Score breakdown
+        'avg_kill_score': data.get('avg_kill_score', 0),
+        'avg_powerup_score': data.get('avg_powerup_score', 0),
+        'avg_survival_score': data.get('avg_survival_score', 0),
+        # Config (should be constant but useful for verification)
+        'population_size': data.get('population_size', 0),
+        'evals_per_individual': data.get('evals_per_individual', 1),
+        'time_scale': data.get('time_scale', 1.0),
+        # Curriculum learning
+        'curriculum_stage': data.get('curriculum_stage', 0),
+        'curriculum_label': data.get('curriculum_label', ''),
+        # NSGA-II (multi-objective)
+        'use_nsga2': data.get('use_nsga2', False),
+        'pareto_front_size': data.get('pareto_front_size', 0),
+        'hypervolume': data.get('hypervolume', 0.0),
+        # NEAT (topology evolution)
+        'use_neat': data.get('use_neat', False),
+        'neat_species_count': data.get('neat_species_count', 0),
+        'neat_compatibility_threshold': data.get('neat_compatibility_threshold', 0.0),
+        # MAP-Elites (quality-diversity)
+        'use_map_elites': data.get('use_map_elites', False),
+        'map_elites_occupied': data.get('map_elites_occupied', 0),
+        'map_elites_coverage': data.get('map_elites_coverage', 0.0),
+        'map_elites_best': data.get('map_elites_best', 0.0),
     }
 
+    # Add co-evolution metrics if present
+    if data.get('coevolution', False):
+        log_data['coevolution'] = True
+        log_data['enemy_best_fitness'] = data.get('enemy_best_fitness', 0)
+        log_data['enemy_all_time_best'] = data.get('enemy_all_time_best', 0)
+        log_data['enemy_avg_fitness'] = data.get('enemy_avg_fitness', 0)
+        log_data['enemy_min_fitness'] = data.get('enemy_min_fitness', 0)
+        log_data['hof_size'] = data.get('hof_size', 0)
+        log_data['is_hof_generation'] = data.get('is_hof_generation', False)
+
+    return log_data
+
 
 def train():
     """Single training run with W&B sweep config"""
@@ -325,7 +117,14 @@ def train():
     # More evals per individual = more time needed
     evals = config.get('evals_per_individual', 1)
     timeout_minutes = int(30 + config.population_size * 0.6 * evals)
-    results = run_godot_training(timeout_minutes=timeout_minutes, worker_id=worker_id, visible=VISIBLE_MODE)
+    results = run_godot_training(
+        timeout_minutes=timeout_minutes,
+        worker_id=worker_id,
+        visible=VISIBLE_MODE,
+        max_generations=config.max_generations,
+        on_generation=_sweep_log_data,
+        log=wandb.log,
+    )
 
     # Log comprehensive summary statistics
     wandb.summary['final_best_fitness'] = results['best_fitness']
@@ -1,15 +1,16 @@
 #!/usr/bin/env python3
 """
 Single W&B-tracked training run with live generation-by-generation logging.
-Polls metrics.json instead of parsing stdout for reliability.
+Follows metrics.json instead of parsing stdout for reliability.
 """
 import json
 import os
 import subprocess
 import sys
+import threading
 import time
 
-import wandb
+from godot_runner import LIVENESS_INTERVAL, read_metrics_if_changed, wait_for_exit, watch_metrics
 
 # Force unbuffered output
 sys.stdout.reconfigure(line_buffering=True)
@@ -35,29 +36,57 @@ PROJECT_PATH = os.path.expanduser("~/Projects/evolve")
 GODOT_USER_DIR = os.path.expanduser("~/Library/Application Support/Godot/app_userdata/evolve")
 METRICS_PATH = os.path.join(GODOT_USER_DIR, "metrics.json")
 CONFIG_PATH = os.path.join(GODOT_USER_DIR, "sweep_config.json")
+INSTANCE_ID = None  # set by --instance-id; Godot then uses metrics_<id>.json / sweep_config_<id>.json
+LOG_DIR = os.path.join(GODOT_USER_DIR, "logs")
 
 # Polling settings
-POLL_INTERVAL = 5  # seconds between metrics checks
+POLL_INTERVAL = 5  # seconds between metrics checks when watchdog isn't installed
 MAX_WAIT_FOR_START = 30  # seconds to wait for training to start
 
+# Godot metrics logged to W&B each generation (alongside "generation")
+_METRIC_KEYS = (
+    "best_fitness",
+    "avg_fitness",
+    "all_time_best",
+    "min_fitness",
+    "elite_avg_fitness",
+    "fitness_std_dev",
+    "improvement_rate",
+    "generations_without_improvement",
+    "avg_kill_score",
+    "avg_powerup_score",
+    "avg_survival_score",
+    "map_elites_coverage",
+    "map_elites_occupied",
+    "map_elites_best",
+    "curriculum_stage",
+)
+
+# Last parsed metrics.json and its (mtime, size), so unchanged files aren't re-read
+_last_metrics = None
+_last_metrics_stat = None
+
 
 def write_config(config):
     """Write config for Godot to read"""
     os.makedirs(GODOT_USER_DIR, exist_ok=True)
-    with open(CONFIG_PATH, 'w') as f:
+    tmp_path = CONFIG_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(config, f, indent=2)
+    os.replace(tmp_path, CONFIG_PATH)
     print(f"Config written to {CONFIG_PATH}")
 
 
 def read_metrics():
-    """Read current metrics from Godot's JSON file"""
+    """Read current metrics from Godot's JSON file, reusing the last parse while it's unchanged"""
+    global _last_metrics, _last_metrics_stat
     try:
-        if not os.path.exists(METRICS_PATH):
-            return None
-        with open(METRICS_PATH) as f:
-            return json.load(f)
+        data, _last_metrics_stat = read_metrics_if_changed(METRICS_PATH, _last_metrics_stat)
     except (FileNotFoundError, json.JSONDecodeError):
         return None
+    if data is not None:
+        _last_metrics = data
+    return _last_metrics
 
 
 def launch_godot(visible=False):
@@ -75,14 +104,25 @@ def launch_godot(visible=False):
 
     cmd.extend(["--", "--auto-train"])
 
+    if INSTANCE_ID:
+        cmd.append(f"--worker-id={INSTANCE_ID}")
+
+    # Godot's output goes straight to a log file; a pipe nobody reads would fill and stall Godot
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_name = f"godot_{INSTANCE_ID}_" if INSTANCE_ID else "godot_"
+    log_path = os.path.join(LOG_DIR, f"{log_name}{time.strftime('%Y%m%d_%H%M%S')}.log")
+
     print(f"Launching Godot: {' '.join(cmd)}")
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1
-    )
+    print(f"Godot output: {log_path}")
+    # close_fds=False lets Popen use posix_spawn instead of fork+exec; Python's own
+    # fds (wandb sockets, etc.) are non-inheritable by default, so nothing leaks
+    with open(log_path, "wb") as log_file:
+        process = subprocess.Popen(
+            cmd,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            close_fds=False
+        )
 
     return process
 
@@ -90,106 +130,118 @@ def launch_godot(visible=False):
 def wait_for_training_start(timeout=MAX_WAIT_FOR_START):
     """Wait for metrics.json to appear (training started)"""
     print(f"Waiting for training to start (timeout: {timeout}s)...")
-    start = time.time()
+    deadline = time.monotonic() + timeout
 
-    while time.time() - start < timeout:
-        if os.path.exists(METRICS_PATH):
-            print("✓ Training started!")
-            return True
-        time.sleep(1)
+    # Godot's first metrics write wakes us; without watchdog, fall back to 1s checks
+    created = threading.Event()
+    observer = watch_metrics(METRICS_PATH, created)
+    try:
+        while True:
+            if os.path.exists(METRICS_PATH):
+                print("✓ Training started!")
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            created.wait(remaining if observer else min(1, remaining))
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
 
     print("✗ Training didn't start in time")
     return False
 
 
 def monitor_training(wandb_run, process):
-    """Poll metrics.json and log to W&B as generations complete"""
+    """Follow metrics.json and log to W&B as generations complete"""
     last_gen = -1
+    metrics = None
 
-    while True:
-        # Check if process is still running
-        if process.poll() is not None:
-            print(f"\nGodot process exited with code {process.returncode}")
-            break
-
-        # Read current metrics
-        metrics = read_metrics()
-        if not metrics:
-            time.sleep(POLL_INTERVAL)
-            continue
-
-        current_gen = metrics.get("generation", -1)
-
-        # Log new generation
-        if current_gen > last_gen:
-            last_gen = current_gen
-
-            # Log all metrics for this generation
-            log_data = {
-                "generation": current_gen,
-                "best_fitness": metrics.get("best_fitness", 0),
-                "avg_fitness": metrics.get("avg_fitness", 0),
-                "all_time_best": metrics.get("all_time_best", 0),
-                "min_fitness": metrics.get("min_fitness", 0),
-                "elite_avg_fitness": metrics.get("elite_avg_fitness", 0),
-                "fitness_std_dev": metrics.get("fitness_std_dev", 0),
-                "improvement_rate": metrics.get("improvement_rate", 0),
-                "generations_without_improvement": metrics.get("generations_without_improvement", 0),
-                "avg_kill_score": metrics.get("avg_kill_score", 0),
-                "avg_powerup_score": metrics.get("avg_powerup_score", 0),
-                "avg_survival_score": metrics.get("avg_survival_score", 0),
-                "map_elites_coverage": metrics.get("map_elites_coverage", 0),
-                "map_elites_occupied": metrics.get("map_elites_occupied", 0),
-                "map_elites_best": metrics.get("map_elites_best", 0),
-                "curriculum_stage": metrics.get("curriculum_stage", 0),
-            }
-
-            wandb_run.log(log_data)
-
-            # Console output
-            print(f"Gen {current_gen:2d} | "
-                  f"Best: {metrics.get('best_fitness', 0):8.1f} | "
-                  f"Avg: {metrics.get('avg_fitness', 0):7.1f} | "
-                  f"ATB: {metrics.get('all_time_best', 0):8.1f} | "
-                  f"Stagnant: {metrics.get('generations_without_improvement', 0)}/{metrics.get('stagnation_limit', 20)}")
-
-        # Check if training is complete (either via training_complete flag OR stagnation)
-        stagnation = metrics.get("generations_without_improvement", 0)
-        stagnation_limit = metrics.get("stagnation_limit", 20)
-        is_stagnant = stagnation >= stagnation_limit
-
-        if metrics.get("training_complete", False) or is_stagnant:
-            reason = "stagnation" if is_stagnant else "training_complete"
-            print(f"\n✓ Training complete! ({reason})")
-            # Log final metrics one more time
-            wandb_run.log(metrics)
-
-            # Kill Godot (it doesn't exit on its own after training)
-            print("Terminating Godot process...")
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                print("Force killing Godot...")
-                process.kill()
-                process.wait()
-
-            break
-
-        time.sleep(POLL_INTERVAL)
+    # Wake on metrics.json writes; the wait timeout only paces Godot liveness checks
+    metrics_changed = threading.Event()
+    observer = watch_metrics(METRICS_PATH, metrics_changed)
+    wait_interval = LIVENESS_INTERVAL if observer else POLL_INTERVAL
+
+    try:
+        while True:
+            # Read current metrics
+            metrics_changed.clear()
+            metrics = read_metrics()
+            if metrics:
+                current_gen = metrics.get("generation", -1)
+
+                # Log new generation
+                if current_gen > last_gen:
+                    last_gen = current_gen
+
+                    # Log all metrics for this generation
+                    log_data = {"generation": current_gen, **{k: metrics.get(k, 0) for k in _METRIC_KEYS}}
+
+                    wandb_run.log(log_data)
+
+                    # Console output
+                    print(f"Gen {current_gen:2d} | "
+                          f"Best: {metrics.get('best_fitness', 0):8.1f} | "
+                          f"Avg: {metrics.get('avg_fitness', 0):7.1f} | "
+                          f"ATB: {metrics.get('all_time_best', 0):8.1f} | "
+                          f"Stagnant: {metrics.get('generations_without_improvement', 0)}/"
+                          f"{metrics.get('stagnation_limit', 20)}")
+
+                # Check if training is complete (either via training_complete flag OR stagnation)
+                stagnation = metrics.get("generations_without_improvement", 0)
+                stagnation_limit = metrics.get("stagnation_limit", 20)
+                is_stagnant = stagnation >= stagnation_limit
+
+                if metrics.get("training_complete", False) or is_stagnant:
+                    reason = "stagnation" if is_stagnant else "training_complete"
+                    print(f"\n✓ Training complete! ({reason})")
+                    # Log final metrics one more time
+                    wandb_run.log(metrics)
+
+                    # Kill Godot (it doesn't exit on its own after training)
+                    print("Terminating Godot process...")
+                    process.terminate()
+                    try:
+                        wait_for_exit(process, 5)
+                    except subprocess.TimeoutExpired:
+                        print("Force killing Godot...")
+                        process.kill()
+                        process.wait()
+
+                    break
+
+            # Check Godot after reading, so a final write just before it exits is still logged
+            if process.poll() is not None:
+                print(f"\nGodot process exited with code {process.returncode}")
+                break
+
+            metrics_changed.wait(wait_interval)
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
 
     return metrics
 
 
 def main():
+    global METRICS_PATH, CONFIG_PATH, INSTANCE_ID
     import argparse
     parser = argparse.ArgumentParser(description="Run single W&B-tracked training")
     parser.add_argument("--visible", action="store_true", help="Run with visible window (not headless)")
     parser.add_argument("--name", type=str, default="optimal-config-run", help="W&B run name")
     parser.add_argument("--tags", type=str, nargs="*", default=["manual", "optimal"], help="W&B tags")
     parser.add_argument("--config", type=str, help="Path to custom config JSON")
+    parser.add_argument("--instance-id", type=str, default=None,
+                        help="Use per-instance metrics/config files so several runs can share one machine")
     args = parser.parse_args()
 
+    if args.instance_id:
+        INSTANCE_ID = args.instance_id
+        METRICS_PATH = os.path.join(GODOT_USER_DIR, f"metrics_{INSTANCE_ID}.json")
+        CONFIG_PATH = os.path.join(GODOT_USER_DIR, f"sweep_config_{INSTANCE_ID}.json")
+
     # Load config
     config = DEFAULT_CONFIG.copy()
     if args.config:
@@ -203,13 +255,16 @@ def main():
     print(f"Config: {json.dumps(config, indent=2)}")
     print(f"Visible: {args.visible}")
     print(f"Run name: {args.name}")
+    if INSTANCE_ID:
+        print(f"Instance: {INSTANCE_ID}")
     print("=" * 60)
 
     # Write config for Godot
     write_config(config)
 
-    # Initialize W&B
+    # Initialize W&B (imported here so --help and config errors don't pay wandb's import time)
     print("\nInitializing W&B...", flush=True)
+    import wandb
     run = wandb.init(
         project="evolve-neuroevolution",
         name=args.name,
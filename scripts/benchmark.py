@@ -10,22 +10,43 @@ Usage:
     python scripts/benchmark.py --preset neat-vs-fixed   # specific preset
     python scripts/benchmark.py --generations 30 --seeds 5
     python scripts/benchmark.py --parallel 4             # concurrent Godot instances
+    python scripts/benchmark.py --parallel 4 --cpu-pin   # ...each pinned to its own cores (Linux)
     python scripts/benchmark.py --wandb                  # log to W&B
 """
 
 import argparse
 import json
 import math
+import os
 import platform as _platform
-import signal
+import queue
+import shutil
 import subprocess
 import sys
+import threading
 import time
 import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from itertools import zip_longest
 from pathlib import Path
-from statistics import mean, stdev
+from statistics import fmean, stdev
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps_indented(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:  # orjson is optional; stdlib json parses the same bytes
+    _json_loads = json.loads
+
+    def _json_dumps_indented(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+# Godot process and metrics-watching helpers, shared with the overnight agent
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "overnight-agent"))
+from godot_runner import signal_godot_group, watch_metrics  # noqa: E402
 
 # ---------------------------------------------------------------------------
 # Paths — auto-detect OS (same pattern as overnight_sweep.py)
@@ -42,7 +63,10 @@ else:
     GODOT_USER_DATA = Path.home() / "Library/Application Support/Godot/app_userdata/Evolve"
 
 REPORTS_DIR = PROJECT_PATH / "reports" / "benchmarks"
-POLL_INTERVAL = 3  # seconds between metrics checks
+# util-linux taskset pins Godot before it execs, so every thread it starts inherits the mask
+TASKSET = shutil.which("taskset")
+POLL_INTERVAL = 3  # seconds between metrics checks without watchdog
+LIVENESS_INTERVAL = 10  # seconds between Godot liveness checks with watchdog
 
 # ---------------------------------------------------------------------------
 # Base config — shared across all presets
@@ -106,14 +130,28 @@ def get_metrics_path(worker_id: str) -> Path:
     return GODOT_USER_DATA / f"metrics_{worker_id}.json"
 
 
+def get_metrics_stream_path(worker_id: str) -> Path:
+    return GODOT_USER_DATA / f"metrics_{worker_id}.ndjson"
+
+
 def write_config(config: dict, worker_id: str) -> None:
     GODOT_USER_DATA.mkdir(parents=True, exist_ok=True)
+    # metrics_stream: Godot also appends each snapshot to metrics_<id>.ndjson
     with open(get_config_path(worker_id), "w") as f:
-        json.dump(config, f, indent=2)
+        json.dump({**config, "metrics_stream": True}, f, indent=2)
+
+
+def read_metrics_stream(stream_path: Path, offset: int) -> tuple[list[dict], int]:
+    """Parse the complete lines appended to the metrics stream since `offset`. Returns (snapshots, new offset)."""
+    with open(stream_path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+    end = chunk.rfind(b"\n") + 1  # a partially written last line waits for the next read
+    return [_json_loads(line) for line in chunk[:end].splitlines() if line], offset + end
 
 
 def cleanup_files(worker_id: str) -> None:
-    for path in [get_config_path(worker_id), get_metrics_path(worker_id)]:
+    for path in [get_config_path(worker_id), get_metrics_path(worker_id), get_metrics_stream_path(worker_id)]:
         try:
             if path.exists():
                 path.unlink()
@@ -132,15 +170,37 @@ def calculate_timeout(config: dict) -> int:
     return int(math.ceil(gens * min_per_gen))
 
 
+def split_cpus(parallel: int) -> list[set[int]] | None:
+    """Split this process's CPUs into `parallel` disjoint sets, one per concurrent Godot.
+
+    One CPU is left to the orchestrator when there are spare ones. Returns None where
+    affinity isn't supported (macOS, Windows) or there are fewer CPUs than workers.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) > parallel:
+        cpus = cpus[1:]
+    per_worker = len(cpus) // parallel
+    if per_worker == 0:
+        return None
+    return [set(cpus[i * per_worker:(i + 1) * per_worker]) for i in range(parallel)]
+
+
 # ---------------------------------------------------------------------------
 # Core execution
 # ---------------------------------------------------------------------------
 def run_single_trial(
-    config: dict, worker_id: str, timeout_min: int
+    config: dict, worker_id: str, timeout_min: int, cpus: set[int] | None = None
 ) -> dict | None:
-    """Launch Godot, poll metrics, return time-series data. Retry once on crash."""
+    """Launch Godot, poll metrics, return time-series data. Retry once on crash.
+
+    With `cpus`, Godot and every thread it starts are confined to those CPUs.
+    """
 
     for attempt in range(2):
+        if _interrupted.is_set():
+            break  # Ctrl+C: don't start (or retry) Godot while the benchmark is shutting down
         cleanup_files(worker_id)
         write_config(config, worker_id)
 
@@ -153,18 +213,43 @@ def run_single_trial(
             f"--worker-id={worker_id}",
         ]
 
+        if cpus and TASKSET:
+            cmd = [TASKSET, "-c", ",".join(map(str, sorted(cpus)))] + cmd
+
+        # Own session/process group so stopping Godot also stops anything it spawned.
+        # Output is discarded: nothing read the old PIPE, which could fill and stall Godot.
         proc = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=(os.name == "posix"),
         )
+        if cpus and not TASKSET:
+            # No preexec_fn: it isn't safe in these worker threads. Threads Godot starts
+            # from here on inherit the mask; any it created in the first instant don't.
+            try:
+                os.sched_setaffinity(proc.pid, cpus)
+            except ProcessLookupError:
+                pass  # Exited immediately; the crash check below handles it
 
         start_time = time.time()
         last_gen = -1
+        last_stat = None  # (st_mtime_ns, st_size) of the last parsed metrics file
         generations = []  # per-gen snapshots
         metrics_path = get_metrics_path(worker_id)
+        stream_path = get_metrics_stream_path(worker_id)
+        stream_offset = 0  # bytes of the metrics stream already consumed
         crash_threshold = timeout_min * 60 * 0.8
 
+        # Wake on metrics writes; the wait timeout only paces liveness/timeout checks
+        metrics_changed = threading.Event()
+        observer = watch_metrics([metrics_path, stream_path], metrics_changed)
+        wait_interval = LIVENESS_INTERVAL if observer else POLL_INTERVAL
+        with _active_processes_lock:
+            _active_processes[worker_id] = (proc, metrics_changed)
+
         try:
-            while time.time() - start_time < timeout_min * 60:
+            while time.time() - start_time < timeout_min * 60 and not _interrupted.is_set():
                 if proc.poll() is not None:
                     elapsed = time.time() - start_time
                     if elapsed < crash_threshold and attempt == 0:
@@ -173,11 +258,24 @@ def run_single_trial(
                     # Either second attempt or ran long enough — accept what we have
                     break
 
+                metrics_changed.clear()
                 try:
-                    if metrics_path.exists():
-                        with open(metrics_path) as f:
-                            data = json.load(f)
-
+                    if stream_offset or stream_path.exists():
+                        # Every generation Godot appended since the last wake, none skipped
+                        snapshots, stream_offset = read_metrics_stream(stream_path, stream_offset)
+                    else:
+                        # Builds without metrics_stream: only the latest rewritten snapshot is available.
+                        # One stat instead of exists(); only re-parse when (mtime, size) changed
+                        snapshots = []
+                        st = os.stat(metrics_path)
+                        stat_key = (st.st_mtime_ns, st.st_size)
+                        if stat_key != last_stat:
+                            with open(metrics_path, "rb") as f:
+                                snapshots.append(_json_loads(f.read()))
+                            last_stat = stat_key
+
+                    finished = False
+                    for data in snapshots:
                         gen = data.get("generation", 0)
                         if gen > last_gen:
                             last_gen = gen
@@ -197,21 +295,34 @@ def run_single_trial(
                                 "pareto_front_size": data.get("pareto_front_size", 0),
                             })
 
-                            if data.get("training_complete", False):
-                                break
-                            if gen >= config.get("max_generations", 50):
+                            if data.get("training_complete", False) or gen >= config.get("max_generations", 50):
+                                finished = True
                                 break
-                except (json.JSONDecodeError, FileNotFoundError, KeyError):
+                    if finished:
+                        break
+                except FileNotFoundError:
+                    pass  # Godot hasn't written its first generation yet
+                except json.JSONDecodeError:
+                    # Godot writes metrics.json via temp file + rename and appends whole stream
+                    # lines, so this only fires for builds that predate the atomic writer
                     pass
 
-                time.sleep(POLL_INTERVAL)
+                metrics_changed.wait(wait_interval)
 
         finally:
-            proc.terminate()
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            signal_godot_group(proc)
             try:
                 proc.wait(timeout=10)
             except subprocess.TimeoutExpired:
-                proc.kill()
+                signal_godot_group(proc, force=True)
+                proc.wait()
+            # Sweep up any children that ignored SIGTERM after Godot itself exited
+            signal_godot_group(proc, force=True)
+            with _active_processes_lock:
+                _active_processes.pop(worker_id, None)
             cleanup_files(worker_id)
 
         # If we got data, return it
@@ -246,51 +357,49 @@ def aggregate_trials(trials: list[dict | None]) -> dict:
     if n == 0:
         return {"valid_trials": 0}
 
-    final_bests = [t["generations"][-1]["all_time_best"] for t in valid]
+    # all_time_best curve per trial, extracted once and shared by the stats below
+    curves = [[snap["all_time_best"] for snap in t["generations"]] for t in valid]
+    final_bests = [curve[-1] for curve in curves]
     final_avgs = [t["generations"][-1]["avg_fitness"] for t in valid]
     wall_times = [t["wall_time_seconds"] for t in valid]
 
-    # Convergence generation: first gen where all_time_best >= 50% of final value
-    convergence_gens = []
-    for t in valid:
-        final_val = t["generations"][-1]["all_time_best"]
-        threshold = final_val * 0.5
-        conv_gen = t["generations"][-1]["generation"]  # default: last gen
-        for snap in t["generations"]:
-            if snap["all_time_best"] >= threshold:
-                conv_gen = snap["generation"]
-                break
-        convergence_gens.append(conv_gen)
-
-    # Per-generation averaged learning curve (aligned by gen index)
-    max_gens = max(t["total_generations"] for t in valid)
-    per_gen_avg_best = []
-    for i in range(max_gens):
-        values = [
-            t["generations"][i]["all_time_best"]
-            for t in valid
-            if i < t["total_generations"]
+    # Convergence generation: first gen where all_time_best >= 50% of final value (default: last gen)
+    convergence_gens = [
+        next(
+            (snap["generation"] for snap in t["generations"] if snap["all_time_best"] >= final_val * 0.5),
+            t["generations"][-1]["generation"],
+        )
+        for t, final_val in zip(valid, final_bests, strict=True)
+    ]
+
+    # Per-generation averaged learning curve (aligned by gen index): transpose the
+    # curves once. Usually every trial ran the same number of generations and the
+    # columns are full; otherwise shorter trials leave None gaps that are skipped
+    if len({len(curve) for curve in curves}) == 1:
+        per_gen_avg_best = [fmean(column) for column in zip(*curves, strict=True)]
+    else:
+        per_gen_avg_best = [
+            fmean([v for v in column if v is not None]) for column in zip_longest(*curves)
         ]
-        per_gen_avg_best.append(mean(values) if values else 0)
 
     result = {
         "valid_trials": n,
         "final_best_fitness": {
-            "mean": mean(final_bests),
+            "mean": fmean(final_bests),
             "std": _safe_stdev(final_bests),
             "min": min(final_bests),
             "max": max(final_bests),
         },
         "final_avg_fitness": {
-            "mean": mean(final_avgs),
+            "mean": fmean(final_avgs),
             "std": _safe_stdev(final_avgs),
         },
         "convergence_generation": {
-            "mean": mean(convergence_gens),
+            "mean": fmean(convergence_gens),
             "std": _safe_stdev(convergence_gens),
         },
         "wall_time_seconds": {
-            "mean": mean(wall_times),
+            "mean": fmean(wall_times),
             "std": _safe_stdev(wall_times),
         },
         "per_generation_avg_best": per_gen_avg_best,
@@ -304,7 +413,7 @@ def aggregate_trials(trials: list[dict | None]) -> dict:
             if t["generations"][-1].get(key, 0) != 0
         ]
         if values:
-            result[key] = {"mean": mean(values), "std": _safe_stdev(values)}
+            result[key] = {"mean": fmean(values), "std": _safe_stdev(values)}
 
     return result
 
@@ -353,13 +462,12 @@ def print_summary_table(report: dict) -> None:
     print()
 
 
-def save_report(report: dict) -> Path:
-    """Save JSON report to reports/benchmarks/."""
+def save_report(report: dict, now: datetime) -> Path:
+    """Save JSON report to reports/benchmarks/, named after the report's own timestamp."""
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    path = REPORTS_DIR / f"{report['preset']}_{timestamp}.json"
-    with open(path, "w") as f:
-        json.dump(report, f, indent=2)
+    path = REPORTS_DIR / f"{report['preset']}_{now:%Y%m%d_%H%M%S}.json"
+    with open(path, "wb") as f:
+        f.write(_json_dumps_indented(report))
     print(f"Report saved: {path}")
     return path
 
@@ -398,13 +506,24 @@ def log_to_wandb(report: dict, project: str) -> None:
             agg["convergence_generation"]["mean"],
             agg["valid_trials"],
         )
-    wandb.log({"benchmark_summary": table})
 
-    # Log per-gen learning curves
-    for name, cond in report["conditions"].items():
-        curve = cond["summary"].get("per_generation_avg_best", [])
-        for i, val in enumerate(curve):
-            wandb.log({f"{name}/avg_best": val, "generation": i})
+    # Per-gen learning curves as one multi-line chart, logged with the table in a single step
+    # (one wandb.log per generation spent a W&B step each and put conditions end to end)
+    curves = {
+        name: cond["summary"]["per_generation_avg_best"]
+        for name, cond in report["conditions"].items()
+        if cond["summary"].get("per_generation_avg_best")
+    }
+    log_data = {"benchmark_summary": table}
+    if curves:
+        log_data["learning_curves"] = wandb.plot.line_series(
+            xs=[list(range(len(curve))) for curve in curves.values()],
+            ys=list(curves.values()),
+            keys=list(curves.keys()),
+            title="Average best fitness per generation",
+            xname="generation",
+        )
+    wandb.log(log_data)
 
     wandb.summary["winner"] = report.get("winner", "none")
     wandb.finish()
@@ -413,8 +532,10 @@ def log_to_wandb(report: dict, project: str) -> None:
 # ---------------------------------------------------------------------------
 # Orchestrator
 # ---------------------------------------------------------------------------
-_active_processes: list[subprocess.Popen] = []
-_active_workers: list[str] = []
+# Running Godot per worker, with the event its trial loop waits on
+_active_processes: dict[str, tuple[subprocess.Popen, threading.Event]] = {}
+_active_processes_lock = threading.Lock()
+_interrupted = threading.Event()
 
 
 def run_benchmark(
@@ -423,25 +544,40 @@ def run_benchmark(
     max_gen: int,
     parallel: int,
     wandb_project: str | None,
+    cpu_pin: bool = False,
 ) -> dict:
     """Run all conditions × seeds, aggregate, report."""
     preset = PRESETS[preset_name]
     condition_names = list(preset.keys())
 
+    # One read-only config per condition, shared by all of its seeds
+    per_cond_config = {
+        cond_name: {**BASE_CONFIG, "max_generations": max_gen, **overrides}
+        for cond_name, overrides in preset.items()
+    }
+
     # Build work items: (condition_name, seed, config, worker_id)
-    work_items = []
-    for cond_name in condition_names:
-        overrides = preset[cond_name]
-        config = {**BASE_CONFIG, "max_generations": max_gen, **overrides}
-        for seed in range(seeds):
-            worker_id = uuid.uuid4().hex[:8]
-            work_items.append((cond_name, seed, config, worker_id))
+    work_items = [
+        (cond_name, seed, per_cond_config[cond_name], uuid.uuid4().hex[:8])
+        for cond_name in condition_names
+        for seed in range(seeds)
+    ]
 
     total = len(work_items)
     print(f"\nBenchmark: {preset_name}")
     print(f"  Conditions: {', '.join(condition_names)}")
     print(f"  Seeds: {seeds}, Generations: {max_gen}, Parallel workers: {parallel}")
     print(f"  Total trials: {total}")
+
+    # Each running trial borrows one CPU set and returns it when Godot exits
+    cpu_sets = split_cpus(parallel) if cpu_pin else None
+    free_cpu_sets: queue.SimpleQueue[set[int]] = queue.SimpleQueue()
+    if cpu_sets:
+        for cpus in cpu_sets:
+            free_cpu_sets.put(cpus)
+        print(f"  CPU pinning: {len(cpu_sets[0])} CPUs per worker")
+    elif cpu_pin:
+        print("  CPU pinning: unavailable (no sched_setaffinity, or fewer CPUs than workers)")
     print()
 
     # Collect results keyed by condition name
@@ -450,12 +586,14 @@ def run_benchmark(
 
     def execute_trial(item):
         cond_name, seed, config, worker_id = item
-        _active_workers.append(worker_id)
         timeout = calculate_timeout(config)
         print(f"  [{worker_id}] Starting {cond_name} seed={seed} (timeout={timeout}m)")
-        trial = run_single_trial(config, worker_id, timeout)
-        if worker_id in _active_workers:
-            _active_workers.remove(worker_id)
+        cpus = free_cpu_sets.get() if cpu_sets else None
+        try:
+            trial = run_single_trial(config, worker_id, timeout, cpus)
+        finally:
+            if cpus:
+                free_cpu_sets.put(cpus)
         status = f"gens={trial['total_generations']}" if trial else "FAILED"
         return cond_name, seed, trial, status
 
@@ -468,8 +606,17 @@ def run_benchmark(
                 completed += 1
                 print(f"  [{completed}/{total}] {cond_name} seed={seed}: {status}")
         except KeyboardInterrupt:
-            print("\n\nInterrupted! Cleaning up...")
+            # Cleanup happens here and in each trial's finally block, on normal threads,
+            # rather than inside a signal handler that can fire mid-I/O
+            print("\n\nInterrupted! Stopping Godot and cleaning up worker files...")
+            _interrupted.set()
             pool.shutdown(wait=False, cancel_futures=True)
+            with _active_processes_lock:
+                running = list(_active_processes.values())
+            # Godot runs in its own session, so the terminal's SIGINT never reached it
+            for proc, metrics_changed in running:
+                signal_godot_group(proc)
+                metrics_changed.set()  # wake the trial now instead of at its next liveness check
             raise
 
     # Aggregate
@@ -489,19 +636,21 @@ def run_benchmark(
                 best_mean = m
                 winner = cond_name
 
+    # One clock read, so the report's timestamp and its filename always agree
+    now = datetime.now()
     report = {
         "preset": preset_name,
         "seeds": seeds,
         "max_generations": max_gen,
         "parallel": parallel,
         "base_config": BASE_CONFIG,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "conditions": conditions,
         "winner": winner,
     }
 
     print_summary_table(report)
-    save_report(report)
+    save_report(report, now)
 
     if wandb_project:
         log_to_wandb(report, wandb_project)
@@ -531,6 +680,11 @@ def main():
     parser.add_argument(
         "--parallel", type=int, default=1, help="Concurrent Godot instances (default: 1)"
     )
+    parser.add_argument(
+        "--cpu-pin",
+        action="store_true",
+        help="Pin each concurrent Godot to its own CPU set (Linux only)",
+    )
     parser.add_argument(
         "--wandb", action="store_true", help="Log results to Weights & Biases"
     )
@@ -550,26 +704,21 @@ def main():
         print(f"Error: Project not found at {PROJECT_PATH}")
         sys.exit(1)
 
-    # Handle Ctrl+C — clean up all worker files and terminate Godot processes
-    original_sigint = signal.getsignal(signal.SIGINT)
-
-    def signal_handler(sig, frame):
-        print("\n\nBenchmark interrupted. Cleaning up worker files...")
-        for wid in list(_active_workers):
-            cleanup_files(wid)
-        signal.signal(signal.SIGINT, original_sigint)
+    # Ctrl+C arrives as KeyboardInterrupt; run_benchmark stops Godot and the trials
+    # clean up their own worker files before the thread pool exits
+    try:
+        run_benchmark(
+            preset_name=args.preset,
+            seeds=args.seeds,
+            max_gen=args.generations,
+            parallel=args.parallel,
+            wandb_project=args.project if args.wandb else None,
+            cpu_pin=args.cpu_pin,
+        )
+    except KeyboardInterrupt:
+        print("Benchmark interrupted.")
         sys.exit(1)
 
-    signal.signal(signal.SIGINT, signal_handler)
-
-    run_benchmark(
-        preset_name=args.preset,
-        seeds=args.seeds,
-        max_gen=args.generations,
-        parallel=args.parallel,
-        wandb_project=args.project if args.wandb else None,
-    )
-
 
 if __name__ == "__main__":
     main()
@@ -2,29 +2,87 @@
 """Check status of W&B sweep worker processes and Godot training instances."""
 
 import json
+import os
 import re
 import subprocess
+import sys
 import time
 from pathlib import Path
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json parses the same bytes
+    _json_loads = json.loads
+
 GODOT_DATA = Path.home() / '.local/share/godot/app_userdata/Evolve'
 
+# Worker scripts and headless Godot
+PROC_RE = re.compile(r'(overnight_(?:evolve|sweep)\.py)|((?i:godot).*--headless)')
+PROC_RE_BYTES = re.compile(PROC_RE.pattern.encode())  # for raw `ps` output
+WORKER_ID_RE = re.compile(r'--worker-id=(\S+)')
+LOG_TAIL_BYTES = 16 * 1024  # enough for the last 20 lines of worker output
+
+
+def proc_table_linux():
+    """Yield (pid, cpu%, mem%, start, command) for matching processes, read straight from /proc."""
+    clk_tck = os.sysconf('SC_CLK_TCK')
+    page_kb = os.sysconf('SC_PAGE_SIZE') / 1024
+    with open('/proc/stat') as f:
+        boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime'))
+    with open('/proc/meminfo') as f:
+        mem_total_kb = int(f.readline().split()[1])
+    now = time.time()
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry.name}/cmdline', 'rb') as f:
+                cmd = f.read().rstrip(b'\0').replace(b'\0', b' ').decode(errors='replace')
+            if not PROC_RE.search(cmd):  # also skips kernel threads (empty cmdline)
+                continue
+            with open(f'/proc/{entry.name}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:  # Process exited mid-walk
+            continue
+        # Fields after "(comm)" are fixed: utime=14, stime=15, starttime=22, rss=24 (1-based)
+        fields = stat[stat.rindex(b')') + 2:].split()
+        cpu_s = (int(fields[11]) + int(fields[12])) / clk_tck
+        started = boot_time + int(fields[19]) / clk_tck
+        cpu = 100 * cpu_s / max(now - started, 1)
+        mem = 100 * int(fields[21]) * page_kb / mem_total_kb
+        yield entry.name, f'{cpu:.1f}', f'{mem:.1f}', time.strftime('%H:%M', time.localtime(started)), cmd
+
+
+def proc_table_ps():
+    """Yield (pid, cpu%, mem%, start, command) for matching processes from `ps aux` (non-Linux)."""
+    # Bytes mode: only the few matching rows are ever decoded, not the whole listing
+    ps = subprocess.run(['ps', 'aux'], capture_output=True)
+    for l in ps.stdout.splitlines():
+        # USER PID %CPU %MEM VSZ RSS TTY STAT START TIME COMMAND — keep COMMAND intact
+        parts = l.split(None, 10)
+        if len(parts) == 11 and PROC_RE_BYTES.search(parts[10]):
+            pid, cpu, mem, start = (parts[i].decode() for i in (1, 2, 3, 8))
+            yield pid, cpu, mem, start, parts[10].decode(errors='replace')
+
+
+py_workers = []
+godot_procs = []
+for proc in proc_table_linux() if sys.platform.startswith('linux') else proc_table_ps():
+    cmd = proc[4]
+    if 'grep' in cmd:
+        continue
+    if PROC_RE.search(cmd).group(1):
+        # Only the interpreter itself (python, python3, /usr/bin/python3.11, venv/bin/python, ...)
+        if 'python' in os.path.basename(cmd.split(None, 1)[0]):
+            py_workers.append(proc)
+    elif '/bin/bash' not in cmd:
+        godot_procs.append(proc)
+
 # ── 1. Python worker processes ──
 print('=== Python Workers ===')
-ps = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-py_workers = []
-for l in ps.stdout.splitlines():
-    if ('overnight_evolve.py' in l or 'overnight_sweep.py' in l) and 'grep' not in l:
-        parts = l.split()
-        cmd = ' '.join(parts[10:])
-        if cmd.startswith('python') or cmd.startswith('/usr/bin/python') or cmd.startswith('/home/'):
-            if 'python' in cmd.split()[0]:
-                py_workers.append(l)
 if py_workers:
-    for w in py_workers:
-        parts = w.split()
-        pid, cpu, mem, start_time = parts[1], parts[2], parts[3], parts[8]
-        cmd = ' '.join(parts[10:])
+    for pid, cpu, mem, start_time, cmd in py_workers:
         short_cmd = re.sub(r'.*/scripts/', 'scripts/', cmd)
         short_cmd = re.sub(r'.*/overnight_', 'overnight_', short_cmd)
         print(f'  PID {pid:>6} | CPU {cpu:>5}% | MEM {mem:>5}% | Start {start_time} | {short_cmd}')
@@ -34,15 +92,10 @@ else:
 # ── 2. Godot headless processes ──
 print()
 print('=== Godot Instances ===')
-godot_procs = [l for l in ps.stdout.splitlines() if 'godot' in l.lower() and '--headless' in l and 'grep' not in l and '/bin/bash' not in l]
 if godot_procs:
-    for g in godot_procs:
-        parts = g.split()
-        pid, cpu, mem, start_time = parts[1], parts[2], parts[3], parts[8]
-        wid = 'none'
-        for p in parts:
-            if '--worker-id=' in p:
-                wid = p.split('=')[1]
+    for pid, cpu, mem, start_time, cmd in godot_procs:
+        wid_match = WORKER_ID_RE.search(cmd)
+        wid = wid_match.group(1) if wid_match else 'none'
         print(f'  PID {pid:>6} | CPU {cpu:>5}% | MEM {mem:>5}% | Start {start_time} | Worker ID: {wid}')
 else:
     print('  No Godot headless instances running')
@@ -50,13 +103,18 @@ else:
 # ── 3. Metrics files ──
 print()
 print('=== Training Progress (metrics files) ===')
-metrics_files = sorted(GODOT_DATA.glob('metrics*.json'), key=lambda f: f.stat().st_mtime, reverse=True) if GODOT_DATA.exists() else []
+# One scandir pass; each file's stat is taken once and reused for sorting, age and the summary
+metrics_files = [
+    (Path(e.path), e.stat()) for e in os.scandir(GODOT_DATA) if e.name.startswith('metrics') and e.name.endswith('.json')
+] if GODOT_DATA.exists() else []
+metrics_files.sort(key=lambda f: f[1].st_mtime, reverse=True)
+now = time.time()
 if metrics_files:
-    for mf in metrics_files:
-        age_s = time.time() - mf.stat().st_mtime
+    for mf, st in metrics_files:
+        age_s = now - st.st_mtime
         age_str = f'{int(age_s)}s ago' if age_s < 60 else f'{int(age_s/60)}m ago' if age_s < 3600 else f'{int(age_s/3600)}h ago'
         try:
-            data = json.loads(mf.read_text())
+            data = _json_loads(mf.read_bytes())
             gen = data.get('generation', '?')
             best = data.get('best_fitness', '?')
             avg = data.get('avg_fitness', '?')
@@ -81,14 +139,19 @@ print()
 print('=== Worker Logs (latest 5) ===')
 log_files = []
 for pattern in [Path('overnight-agent') / 'worker*.log', Path('/tmp') / 'sweep_worker_*.log', Path('.') / 'worker*.log']:
-    log_files.extend(pattern.parent.glob(pattern.name))
-log_files = sorted(log_files, key=lambda f: f.stat().st_mtime, reverse=True)
+    log_files.extend((lf, lf.stat()) for lf in pattern.parent.glob(pattern.name))
+log_files.sort(key=lambda f: f[1].st_mtime, reverse=True)
 if log_files:
-    for lf in log_files[:5]:
-        age_s = time.time() - lf.stat().st_mtime
+    for lf, st in log_files[:5]:
+        age_s = now - st.st_mtime
         age_str = f'{int(age_s)}s ago' if age_s < 60 else f'{int(age_s/60)}m ago' if age_s < 3600 else f'{int(age_s/3600)}h ago'
-        size_kb = lf.stat().st_size / 1024
-        lines = lf.read_text().strip().splitlines()
+        size_kb = st.st_size / 1024
+        # Only the tail matters; nightly logs run to megabytes
+        with open(lf, 'rb') as f:
+            f.seek(max(0, st.st_size - LOG_TAIL_BYTES))
+            lines = f.read().decode(errors='replace').strip().splitlines()
+        if st.st_size > LOG_TAIL_BYTES:
+            lines = lines[1:]  # first line was cut by the seek
         last_lines = [l for l in lines[-20:] if l.strip() and not any(x in l for x in ['wandb: Find logs', 'wandb: Synced', 'wandb: \u2b50'])][-3:]
         print(f'  {lf} ({size_kb:.0f}KB, updated {age_str})')
         for ll in last_lines:
@@ -97,8 +160,8 @@ else:
     print('  No worker log files found')
 
 # ── 5. Summary ──
-active_metrics = [f for f in metrics_files if time.time() - f.stat().st_mtime < 300]
-stale_metrics = [f for f in metrics_files if time.time() - f.stat().st_mtime >= 300]
+active_metrics = [mf for mf, st in metrics_files if now - st.st_mtime < 300]
+stale_metrics = [mf for mf, st in metrics_files if now - st.st_mtime >= 300]
 print()
 print('=== Summary ===')
 print(f'  Python workers:       {len(py_workers)}')
@@ -11,11 +11,19 @@ Usage:
 """
 
 import argparse
+import errno
+import glob
 import os
 import platform
+import re
 import shutil
+import signal
 import subprocess
 import sys
+import threading
+
+EXPORT_TIMEOUT = 120  # seconds
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
 
 
 def get_user_data_dir() -> str:
@@ -38,18 +46,90 @@ def get_user_data_dir() -> str:
         sys.exit(f"Unsupported platform: {system}")
 
 
+def _godot_version(path: str) -> tuple[int, ...]:
+    """(4, 10) for .../Godot_v4.10-stable_linux.x86_64, so 4.10 sorts above 4.9."""
+    match = re.match(r"Godot_v(\d+(?:\.\d+)*)", os.path.basename(path))
+    return tuple(int(part) for part in match.group(1).split(".")) if match else ()
+
+
 def find_godot() -> str:
-    """Find the Godot executable on PATH."""
-    for name in ("godot", "godot4"):
+    """Find the Godot executable: $GODOT_PATH if set, otherwise search PATH."""
+    env_path = os.environ.get("GODOT_PATH")
+    if env_path and os.access(env_path, os.X_OK):
+        return env_path
+    for name in ("godot", "godot4", "godot-headless"):
         path = shutil.which(name)
         if path:
             return path
+    # The official download keeps its versioned name (Godot_v4.5-stable_linux.x86_64) unless renamed
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if not directory:  # An empty entry means cwd; don't pick up a stray binary from there
+            continue
+        for path in sorted(glob.glob(os.path.join(directory, "Godot_v4*")), key=_godot_version, reverse=True):
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                return path
     sys.exit(
         "Error: Godot executable not found on PATH. "
-        "Install Godot 4.5+ and ensure 'godot' is in your PATH."
+        "Install Godot 4.5+ and ensure 'godot' is in your PATH, or set GODOT_PATH."
     )
 
 
+def _try_reflink(src: str, dst: str) -> bool:
+    """Clone src into dst with the FICLONE ioctl (btrfs, xfs); no data is copied.
+
+    Returns False when the filesystem can't share extents, leaving dst for a real copy.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:  # EOPNOTSUPP / EXDEV / EINVAL: not a CoW filesystem, or src and dst differ
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def _fast_copy(src: str, dst: str) -> None:
+    """Copy src to dst inside the kernel, then carry over its metadata like shutil.copy2.
+
+    copy_file_range lets CoW filesystems (btrfs, xfs) share extents instead of moving
+    bytes; sendfile covers cross-filesystem copies and older kernels.
+    """
+    if not hasattr(os, "copy_file_range"):  # Not Linux
+        shutil.copyfile(src, dst)
+        shutil.copystat(src, dst)
+        return
+
+    in_fd = os.open(src, os.O_RDONLY)
+    try:
+        out_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            remaining = os.fstat(in_fd).st_size
+            use_sendfile = False
+            while remaining > 0:
+                if not use_sendfile:
+                    try:
+                        copied = os.copy_file_range(in_fd, out_fd, remaining)
+                    except OSError as e:
+                        if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                            raise
+                        use_sendfile = True
+                        continue
+                else:
+                    copied = os.sendfile(out_fd, in_fd, None, remaining)
+                if copied == 0:  # Source shrank underneath us
+                    break
+                remaining -= copied
+        finally:
+            os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    shutil.copystat(src, dst)
+
+
 def ensure_export_presets(project_dir: str) -> bool:
     """Generate a minimal export_presets.cfg if one doesn't exist.
 
@@ -116,10 +196,27 @@ def main():
 
     # 2. Copy network into res://models/ so it gets packed into the .pck
     models_dir = os.path.join(project_dir, "models")
-    os.makedirs(models_dir, exist_ok=True)
     dest = os.path.join(models_dir, "best_network.nn")
-    shutil.copy2(network_path, dest)
-    print(f"Copied network to {dest}")
+    # Remember what was already there so cleanup only removes what we added
+    models_existed = os.path.isdir(models_dir)
+    dest_existed = os.path.exists(dest)
+    os.makedirs(models_dir, exist_ok=True)
+    if dest_existed and os.path.samefile(network_path, dest):
+        print(f"Network already at {dest}")
+    else:
+        # Copy beside dest and rename, so a failed copy never leaves a truncated network
+        tmp_dest = dest + ".tmp"
+        try:
+            if not _try_reflink(network_path, tmp_dest):
+                _fast_copy(network_path, tmp_dest)
+            os.replace(tmp_dest, dest)
+        except BaseException:
+            try:
+                os.unlink(tmp_dest)
+            except FileNotFoundError:
+                pass
+            raise
+        print(f"Copied network to {dest}")
 
     # 3. Ensure export presets exist
     created_presets = ensure_export_presets(project_dir)
@@ -130,17 +227,62 @@ def main():
     cmd = [godot, "--headless", "--path", project_dir, "--export-pack", "PCK", output_path]
     print(f"Running: {' '.join(cmd)}")
 
+    # Stream Godot's log as it arrives rather than buffering all of it. Godot gets its own
+    # process group so a timeout kill can't leave headless children behind.
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        start_new_session=(os.name == "posix"),
+    )
+    timed_out = threading.Event()
+
+    def kill_export():
+        timed_out.set()
+        try:
+            if os.name == "posix":
+                os.killpg(proc.pid, signal.SIGKILL)
+            else:
+                proc.kill()
+        except ProcessLookupError:
+            pass  # Finished just as the timer fired
+
+    timer = threading.Timer(EXPORT_TIMEOUT, kill_export)
+    timer.start()
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode != 0:
-            print(f"Godot stderr:\n{result.stderr}")
-            sys.exit(f"Export failed with return code {result.returncode}")
-    except subprocess.TimeoutExpired:
-        sys.exit("Export timed out after 120 seconds")
+        for line in proc.stdout:
+            print(f"  | {line}", end="")
+        proc.wait()
+    except BaseException:
+        # In its own session Godot doesn't see our Ctrl+C; don't leave it holding the project
+        try:
+            if os.name == "posix":
+                os.killpg(proc.pid, signal.SIGTERM)
+            else:
+                proc.terminate()
+        except ProcessLookupError:
+            pass  # Already exited
+        proc.wait()
+        raise
+    finally:
+        timer.cancel()
+
+    if timed_out.is_set():
+        sys.exit(f"Export timed out after {EXPORT_TIMEOUT} seconds")
+    if proc.returncode != 0:
+        sys.exit(f"Export failed with return code {proc.returncode}")
 
     # 5. Clean up
-    shutil.rmtree(models_dir)
-    print(f"Cleaned up {models_dir}/")
+    if not dest_existed:
+        os.unlink(dest)
+        print(f"Cleaned up {dest}")
+    if not models_existed:
+        try:
+            os.rmdir(models_dir)
+        except OSError:
+            pass  # Something else was put in models/ meanwhile; leave it
 
     if created_presets:
         os.remove(os.path.join(project_dir, "export_presets.cfg"))
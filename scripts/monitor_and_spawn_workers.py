@@ -15,19 +15,23 @@ from __future__ import annotations
 import argparse
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "shared-evolve-utils"))
-
-from godot_wandb import create_or_join_sweep, godot_user_dir  # noqa: E402
-from worker_monitor import WorkerConfig, add_monitor_args, monitor_once  # noqa: E402
+if TYPE_CHECKING:
+    from worker_monitor import WorkerConfig
 
 _HERE = Path(__file__).parent
+SHARED_UTILS = _HERE.parent.parent / "shared-evolve-utils"
 EVOLVE_PROJECT = _HERE.parent
 WANDB_PROJECT = "evolve-neuroevolution"
 APP_NAME = "Evolve"
 
 
 def _make_config() -> WorkerConfig:
+    # godot_wandb is imported where it's used, so `--help` doesn't pay for it
+    from godot_wandb import godot_user_dir
+    from worker_monitor import WorkerConfig
+
     return WorkerConfig(
         godot_data_dir=godot_user_dir(APP_NAME),
         worker_script=EVOLVE_PROJECT / "scripts" / "overnight_sweep.py",
@@ -45,13 +49,21 @@ def _make_sweep_fn(cfg: WorkerConfig, sweep_id: str | None) -> callable:
         return lambda: sweep_id
 
     def _create():
+        from godot_wandb import create_or_join_sweep
+
         from overnight_sweep import SWEEP_CONFIG  # type: ignore[import]
+
         return create_or_join_sweep(SWEEP_CONFIG, cfg.wandb_project)
 
     return _create
 
 
 def main() -> int:
+    # shared-evolve-utils goes on sys.path only when the monitor actually runs,
+    # so importing this module (docs, tooling) stays side-effect free
+    sys.path.insert(0, str(SHARED_UTILS))
+    from worker_monitor import add_monitor_args, monitor_once
+
     parser = argparse.ArgumentParser(
         description="Monitor and auto-spawn evolve project workers",
         formatter_class=argparse.RawDescriptionHelpFormatter,
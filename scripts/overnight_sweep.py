@@ -11,13 +11,25 @@ Usage:
 """
 
 import argparse
+import json
 import os
 import sys
+import threading
 import time
 from pathlib import Path
 
 import wandb
 
+# Godot process and metrics-watching helpers, shared with the overnight agent
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "overnight-agent"))
+from godot_runner import (  # noqa: E402
+    LIVENESS_INTERVAL,
+    POLL_INTERVAL,
+    read_metrics_if_changed,
+    wake_on_exit,
+    watch_metrics,
+)
+
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'shared-evolve-utils'))
 import platform as _platform  # noqa: E402
 
@@ -30,7 +42,6 @@ from godot_wandb import (  # noqa: E402
     godot_user_dir,
     launch_godot,
     log_final_summary,
-    read_metrics,
     run_sweep_agent,
 )
 
@@ -41,6 +52,8 @@ from godot_wandb import (  # noqa: E402
 SWEEP_CONFIG = {
     "method": "bayes",
     "metric": {"name": "avg_fitness", "goal": "maximize"},
+    # Hyperband pruning: stop runs whose avg_fitness trails the sweep at gen 5, 15, 45
+    "early_terminate": {"type": "hyperband", "min_iter": 5, "eta": 3},
     "parameters": {
         # Population (120-150 dominated top runs)
         "population_size": {"values": [120, 150]},
@@ -97,6 +110,10 @@ def run_godot_training(config: dict, timeout_minutes: int = 20):
         worker_id=_worker.worker_id,
     )
 
+    # Fixed for the whole trial, so resolve them once rather than through wandb.config every generation
+    parallel_count = int(config.get("parallel_count", 5))
+    max_generations = int(config.get("max_generations", 50))
+
     start_time = time.time()
     last_gen = -1
     best_fitness = 0
@@ -104,13 +121,26 @@ def run_godot_training(config: dict, timeout_minutes: int = 20):
     best_history: list[float] = []
     avg_history: list[float] = []
 
+    # Wake on metrics writes or Godot exiting; the wait timeout is only a backstop
+    metrics_path = Path(_worker.metrics_path)
+    last_stat = None  # (st_mtime_ns, st_size) of the last parsed metrics file
+    metrics_changed = threading.Event()
+    observer = watch_metrics(metrics_path, metrics_changed)
+    wake_on_exit(proc, metrics_changed)
+    wait_interval = LIVENESS_INTERVAL if observer else POLL_INTERVAL
+
     try:
         while time.time() - start_time < timeout_minutes * 60:
             if proc.poll() is not None:
                 print("  Godot process ended")
                 break
 
-            data = read_metrics(_worker.metrics_path)
+            metrics_changed.clear()
+            # One stat per wake; only re-parse when Godot has actually rewritten the file
+            try:
+                data, last_stat = read_metrics_if_changed(metrics_path, last_stat)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = None  # Not written yet, removed mid-read, or a pre-atomic-writer Godot mid-write
             if data and "generation" in data:
                 gen = data.get("generation", 0)
                 if gen > last_gen:
@@ -150,7 +180,7 @@ def run_godot_training(config: dict, timeout_minutes: int = 20):
                         "curriculum_label": data.get("curriculum_label", ""),
                         # Training config
                         "time_scale": data.get("time_scale", 0),
-                        "parallel_count": int(wandb.config.get("parallel_count", 5)),
+                        "parallel_count": parallel_count,
                         # MAP-Elites
                         "map_elites_best": data.get("map_elites_best", 0),
                         "map_elites_coverage": data.get("map_elites_coverage", 0),
@@ -170,7 +200,7 @@ def run_godot_training(config: dict, timeout_minutes: int = 20):
                         print("  Training complete (early stop or max gen)")
                         break
 
-                    if gen >= wandb.config.max_generations:
+                    if gen >= max_generations:
                         print("  Max generations reached")
                         break
 
@@ -181,9 +211,12 @@ def run_godot_training(config: dict, timeout_minutes: int = 20):
                         print(f"  Early stopping: No improvement for {stagnation} generations (limit: {stagnation_limit})")
                         break
 
-            time.sleep(3)
+            metrics_changed.wait(wait_interval)
 
     finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
         proc.terminate()
         try:
             proc.wait(timeout=10)
@@ -23,17 +23,30 @@ Exit codes:
 import argparse
 import os
 import platform
+import re
 import shutil
+import signal
 import subprocess
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 
 PROJECT_DIR = Path(__file__).resolve().parent.parent
+_PROJECT_STR = str(PROJECT_DIR)  # cwd / --path for every subprocess
 REPORTS_DIR = PROJECT_DIR / "test" / "integration" / "reports"
 COMPARE_SCRIPT = PROJECT_DIR / "test" / "integration" / "compare_reports.py"
 
+# Line prefixes of import/declaration lines that conflict auto-resolution may merge
+_IMPORT_PREFIXES = ("import ", "from ", "var ", "const ", "preload(", "@onready", "#")
+
+# Godot output lines worth reporting from the gameplay and training smoke phases
+_GAMEPLAY_PAT = re.compile(r"PASS|FAIL|Result|GAMEPLAY TEST")
+_TRAINING_PAT = re.compile(r"PASS|FAIL|Gen|ERROR|Training")
+
 # Godot user data dir (OS-dependent)
 if platform.system() == "Darwin":
     GODOT_USER_DIR = Path.home() / "Library" / "Application Support" / "Godot" / "app_userdata" / "Evolve"
@@ -49,30 +62,69 @@ def header(text: str) -> None:
     print(f"{'='*50}")
 
 
-def run_cmd(cmd: list[str], timeout: int = 120, label: str = "") -> tuple[int, str]:
-    """Run a command, capture output, return (exit_code, output)."""
+def _kill_group(proc: subprocess.Popen) -> None:
+    """Kill a command started by run_cmd along with anything it spawned."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass  # Already gone
+
+
+def run_cmd(cmd: list[str], timeout: int = 120, label: str = "",
+            keep: re.Pattern[str] | None = None) -> tuple[int, str]:
+    """
+    Run a command, reading its output as it arrives, return (exit_code, output).
+    With `keep`, output holds only the lines the pattern matches, so long
+    Godot runs aren't held in memory; the last 40 lines are still shown on failure.
+    """
     print(f"  Running: {' '.join(cmd)}")
     try:
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=timeout,
-            cwd=str(PROJECT_DIR),
+        # Own process group, so a timeout also takes down anything Godot spawned
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+            cwd=_PROJECT_STR, start_new_session=(os.name == "posix"),
         )
-        output = result.stdout + result.stderr
-        if result.returncode != 0:
-            print(f"  [{label}] Exit code: {result.returncode}")
-            if output.strip():
-                # Show last 40 lines on failure
-                lines = output.strip().split("\n")
-                for line in lines[-40:]:
-                    print(f"    {line}")
-        return result.returncode, output
-    except subprocess.TimeoutExpired:
-        print(f"  [{label}] TIMEOUT after {timeout}s")
-        return 124, f"Timeout after {timeout}s"
     except FileNotFoundError:
         print(f"  [{label}] Command not found: {cmd[0]}")
         return 127, f"Command not found: {cmd[0]}"
 
+    timed_out = threading.Event()
+
+    def on_timeout():
+        timed_out.set()
+        _kill_group(proc)
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.start()
+    tail: deque[str] = deque(maxlen=40)
+    kept: list[str] = []
+    try:
+        for line in proc.stdout:
+            line = line.rstrip("\n")
+            tail.append(line)
+            if keep is None or keep.search(line):
+                kept.append(line)
+        proc.wait()
+    finally:
+        timer.cancel()
+        if proc.poll() is None:  # Interrupted while reading
+            _kill_group(proc)
+            proc.wait()
+
+    if timed_out.is_set():
+        print(f"  [{label}] TIMEOUT after {timeout}s")
+        return 124, f"Timeout after {timeout}s"
+    if proc.returncode != 0:
+        print(f"  [{label}] Exit code: {proc.returncode}")
+        # Show last 40 lines on failure
+        if any(line.strip() for line in tail):
+            for line in tail:
+                print(f"    {line}")
+    return proc.returncode, "\n".join(kept)
+
 
 ## ---------------------------------------------------------------------------
 ## Phase 0: Merge Conflict Detection & Auto-Resolution
@@ -102,7 +154,8 @@ def _git(args: list[str], check: bool = False, **kwargs) -> subprocess.Completed
     """Run a git command in PROJECT_DIR."""
     return subprocess.run(
         ["git"] + args,
-        cwd=str(PROJECT_DIR),
+        cwd=_PROJECT_STR,
+        stdin=subprocess.DEVNULL,
         capture_output=True,
         text=True,
         check=check,
@@ -115,61 +168,68 @@ def _current_branch() -> str:
     return r.stdout.strip()
 
 
-def _parse_conflict_blocks(file_path: Path) -> list[ConflictBlock]:
-    """Parse conflict markers in a file and return ConflictBlock list."""
+def _unmerged_files() -> list[str]:
+    """List conflicted paths from one `git status --porcelain=v2 -z` call."""
+    records = iter(_git(["status", "--porcelain=v2", "-z"]).stdout.split("\0"))
+    files: list[str] = []
+    for record in records:
+        if record.startswith("u "):
+            # u <XY> <sub> <m1> <m2> <m3> <mW> <h1> <h2> <h3> <path>
+            files.append(record.split(" ", 10)[10])
+        elif record.startswith("2 "):
+            next(records, None)  # Renames carry their original path as an extra record
+    return files
+
+
+def _resolve_file(file_path: Path) -> tuple[list[ConflictBlock], bool]:
+    """
+    Parse conflict markers, auto-resolve each block and rewrite the file in one pass.
+    Resolved blocks are replaced by their resolution; the rest keep their markers.
+    Returns (blocks, all_resolved).
+    """
     text = file_path.read_text()
-    blocks: list[ConflictBlock] = []
+    # Not splitlines(): it also breaks on \f, \v, \x85, \u2028..., which the join would turn into newlines
     lines = text.split("\n")
+    result: list[str] = []
+    blocks: list[ConflictBlock] = []
 
-    ours: list[str] = []
-    theirs: list[str] = []
-    in_ours = False
-    in_theirs = False
-    context_before = ""
+    # Marker indices of the open block; text between blocks is copied over in slices
+    start_idx: int | None = None
+    mid_idx: int | None = None
+    prev = 0
 
     for i, line in enumerate(lines):
         if line.startswith("<<<<<<< "):
-            in_ours = True
-            ours = []
-            # grab up to 3 lines of context before the marker
-            start = max(0, i - 3)
-            context_before = "\n".join(lines[start:i])
-            continue
-        if line.startswith("=======") and in_ours:
-            in_ours = False
-            in_theirs = True
-            theirs = []
-            continue
-        if line.startswith(">>>>>>> ") and in_theirs:
-            in_theirs = False
-            blocks.append(ConflictBlock(
+            start_idx, mid_idx = i, None
+        elif line.startswith("=======") and start_idx is not None and mid_idx is None:
+            mid_idx = i
+        elif line.startswith(">>>>>>> ") and mid_idx is not None:
+            block = ConflictBlock(
                 file_path=str(file_path.relative_to(PROJECT_DIR)),
-                ours=ours[:],
-                theirs=theirs[:],
-                context_before=context_before,
-            ))
-            continue
-        if in_ours:
-            ours.append(line)
-        elif in_theirs:
-            theirs.append(line)
-
-    return blocks
+                ours=lines[start_idx + 1:mid_idx],
+                theirs=lines[mid_idx + 1:i],
+                # up to 3 lines of context before the marker
+                context_before="\n".join(lines[max(0, start_idx - 3):start_idx]),
+            )
+            blocks.append(block)
+            result.extend(lines[prev:start_idx])
+            result.extend(block.resolution if _try_auto_resolve(block) else lines[start_idx:i + 1])
+            prev = i + 1
+            start_idx = mid_idx = None
+    # Tail of the file, including any unterminated region exactly as found
+    result.extend(lines[prev:])
+
+    # With nothing resolved the rewrite would reproduce the file byte for byte
+    if any(b.auto_resolved for b in blocks):
+        file_path.write_text("\n".join(result))
+    return blocks, all(b.auto_resolved for b in blocks)
 
 
 def _is_import_block(lines: list[str]) -> bool:
     """Check if all non-empty lines look like imports/preloads (GDScript or Python)."""
     for line in lines:
         stripped = line.strip()
-        if not stripped:
-            continue
-        if not (stripped.startswith("import ")
-                or stripped.startswith("from ")
-                or stripped.startswith("var ")
-                or stripped.startswith("const ")
-                or stripped.startswith("preload(")
-                or stripped.startswith("@onready")
-                or stripped.startswith("#")):
+        if stripped and not stripped.startswith(_IMPORT_PREFIXES):
             return False
     return True
 
@@ -211,26 +271,22 @@ def _try_auto_resolve(block: ConflictBlock) -> bool:
         return True
 
     # Case 2: one side empty (deleted vs added) — keep the addition
-    if not [l for l in ours if l.strip()] and theirs:
+    if not any(l.strip() for l in ours) and theirs:
         block.resolution = theirs
         block.auto_resolved = True
         return True
-    if not [l for l in theirs if l.strip()] and ours:
+    if not any(l.strip() for l in theirs) and ours:
         block.resolution = ours
         block.auto_resolved = True
         return True
 
     # Case 3: both are import/declaration blocks — merge and dedupe
     if _is_import_block(ours) and _is_import_block(theirs):
-        seen: set[str] = set()
-        merged: list[str] = []
+        # Keyed on the stripped line; dicts keep the first spelling in insertion order
+        merged: dict[str, str] = {}
         for line in ours + theirs:
-            key = line.strip()
-            if key in seen:
-                continue
-            seen.add(key)
-            merged.append(line)
-        block.resolution = merged
+            merged.setdefault(line.strip(), line)
+        block.resolution = list(merged.values())
         block.auto_resolved = True
         return True
 
@@ -238,57 +294,26 @@ def _try_auto_resolve(block: ConflictBlock) -> bool:
     return False
 
 
-def _apply_resolutions(file_path: Path, blocks: list[ConflictBlock]) -> bool:
+def _resolve_one(fpath_str: str) -> tuple[str, bool, list[ConflictBlock]]:
     """
-    Rewrite a conflicted file, substituting resolved blocks and leaving
-    unresolved blocks as conflict markers.
-    Returns True if ALL blocks were resolved.
+    Parse, auto-resolve and rewrite one conflicted file.
+    Returns (path, fully_resolved, unresolved_blocks).
     """
-    text = file_path.read_text()
-    lines = text.split("\n")
-    result: list[str] = []
-    block_idx = 0
-    skip_until_end = False
-    in_ours = False
-    in_theirs = False
-
-    for line in lines:
-        if line.startswith("<<<<<<< ") and block_idx < len(blocks):
-            blk = blocks[block_idx]
-            if blk.auto_resolved:
-                # Replace entire conflict region with resolution
-                skip_until_end = True
-                in_ours = True
-                continue
-            else:
-                result.append(line)
-                continue
-        if line.startswith("=======") and (skip_until_end or in_ours):
-            if skip_until_end:
-                in_ours = False
-                in_theirs = True
-                continue
-            result.append(line)
-            continue
-        if line.startswith(">>>>>>> ") and (skip_until_end or in_theirs):
-            if skip_until_end:
-                blk = blocks[block_idx]
-                result.extend(blk.resolution)
-                skip_until_end = False
-                in_ours = False
-                in_theirs = False
-                block_idx += 1
-                continue
-            result.append(line)
-            block_idx += 1
-            in_theirs = False
-            continue
-        if skip_until_end:
-            continue
-        result.append(line)
-
-    file_path.write_text("\n".join(result))
-    return all(b.auto_resolved for b in blocks)
+    fpath = PROJECT_DIR / fpath_str
+    if not fpath.exists():
+        return fpath_str, False, [ConflictBlock(
+            file_path=fpath_str, ours=[], theirs=[],
+            context_before="File not found after merge attempt",
+        )]
+
+    blocks, file_fully_resolved = _resolve_file(fpath)
+    if not blocks:
+        # Git says conflict but no markers found — might be binary or deleted
+        return fpath_str, False, [ConflictBlock(
+            file_path=fpath_str, ours=[], theirs=[],
+            context_before="No conflict markers found (binary or delete conflict?)",
+        )]
+    return fpath_str, file_fully_resolved, [b for b in blocks if not b.auto_resolved]
 
 
 def phase_merge_conflicts(target_branch: str = "main") -> MergeReport:
@@ -346,8 +371,7 @@ def phase_merge_conflicts(target_branch: str = "main") -> MergeReport:
     print("  ⚠ Merge conflicts detected")
 
     # Get list of conflicted files
-    diff_result = _git(["diff", "--name-only", "--diff-filter=U"])
-    conflicted_files = [f.strip() for f in diff_result.stdout.strip().split("\n") if f.strip()]
+    conflicted_files = _unmerged_files()
     print(f"  Conflicted files ({len(conflicted_files)}):")
     for f in conflicted_files:
         print(f"    - {f}")
@@ -355,41 +379,20 @@ def phase_merge_conflicts(target_branch: str = "main") -> MergeReport:
     report.clean = False
     all_resolved = True
 
-    for fpath_str in conflicted_files:
-        fpath = PROJECT_DIR / fpath_str
-        if not fpath.exists():
-            report.manual_conflicts.append(ConflictBlock(
-                file_path=fpath_str, ours=[], theirs=[],
-                context_before="File not found after merge attempt",
-            ))
-            all_resolved = False
-            continue
-
-        blocks = _parse_conflict_blocks(fpath)
-        if not blocks:
-            # Git says conflict but no markers found — might be binary or deleted
-            report.manual_conflicts.append(ConflictBlock(
-                file_path=fpath_str, ours=[], theirs=[],
-                context_before="No conflict markers found (binary or delete conflict?)",
-            ))
-            all_resolved = False
-            continue
-
-        # Try auto-resolving each block
-        for block in blocks:
-            _try_auto_resolve(block)
-
-        file_fully_resolved = _apply_resolutions(fpath, blocks)
+    # Files are independent, so their reads and rewrites overlap; git and the report stay on this thread
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        resolved = list(pool.map(_resolve_one, conflicted_files))
 
+    for fpath_str, file_fully_resolved, unresolved in resolved:
         if file_fully_resolved:
             report.auto_resolved_files.append(fpath_str)
-            _git(["add", fpath_str])
             print(f"    ✓ Auto-resolved: {fpath_str}")
         else:
-            unresolved = [b for b in blocks if not b.auto_resolved]
             report.manual_conflicts.extend(unresolved)
             all_resolved = False
             print(f"    ✗ Manual resolution needed: {fpath_str} ({len(unresolved)} conflict(s))")
+    if report.auto_resolved_files:
+        _git(["add", "--", *report.auto_resolved_files])
 
     if all_resolved:
         report.clean = True
@@ -446,16 +449,18 @@ def find_godot(godot_arg: str | None) -> str:
     if godot_arg:
         return godot_arg
     for name in ["godot", "godot4"]:
-        if shutil.which(name):
-            return name
+        # Resolved once here, so each phase execs the binary without searching PATH again
+        path = shutil.which(name)
+        if path:
+            return path
     print("ERROR: godot not found in PATH. Use --godot=<path>")
     sys.exit(3)
 
 
-def phase_unit_tests(godot: str) -> bool:
+def phase_unit_tests(godot_cmd: list[str]) -> bool:
     header("Phase 1: Unit Tests")
     code, output = run_cmd(
-        [godot, "--headless", "--path", str(PROJECT_DIR), "--script", "test/test_runner.gd"],
+        godot_cmd + ["--script", "test/test_runner.gd"],
         timeout=60, label="unit-tests",
     )
     if code == 0:
@@ -466,19 +471,18 @@ def phase_unit_tests(godot: str) -> bool:
         return False
 
 
-def phase_gameplay_tests(godot: str, quick: bool = False) -> bool:
+def phase_gameplay_tests(godot_cmd: list[str], quick: bool = False) -> bool:
     header("Phase 2: Gameplay Integration Tests")
     scenario = "boot_and_run" if quick else "all"
     code, output = run_cmd(
-        [godot, "--headless", "--path", str(PROJECT_DIR),
-         "--script", "test/integration/gameplay_test_runner.gd",
-         "--", f"--scenario={scenario}"],
+        godot_cmd + ["--script", "test/integration/gameplay_test_runner.gd",
+                     "--", f"--scenario={scenario}"],
         timeout=180, label="gameplay-tests",
+        keep=_GAMEPLAY_PAT,
     )
     # Print relevant output
-    for line in output.split("\n"):
-        if any(k in line for k in ["PASS", "FAIL", "Result", "GAMEPLAY TEST"]):
-            print(f"    {line.strip()}")
+    for line in output.splitlines():
+        print(f"    {line.strip()}")
 
     if code == 0:
         print("  ✓ Gameplay tests passed")
@@ -488,18 +492,17 @@ def phase_gameplay_tests(godot: str, quick: bool = False) -> bool:
         return False
 
 
-def phase_training_smoke(godot: str) -> bool:
+def phase_training_smoke(godot_cmd: list[str]) -> bool:
     header("Phase 3: Training Mode Smoke Test")
     # Run the game in headless auto-train mode briefly to verify training loop works
     # We use a short timeout — training should start and produce at least 1 generation
     code, output = run_cmd(
-        [godot, "--headless", "--path", str(PROJECT_DIR),
-         "--script", "test/integration/training_smoke_test.gd"],
+        godot_cmd + ["--script", "test/integration/training_smoke_test.gd"],
         timeout=120, label="training-smoke",
+        keep=_TRAINING_PAT,
     )
-    for line in output.split("\n"):
-        if any(k in line for k in ["PASS", "FAIL", "Gen", "ERROR", "Training"]):
-            print(f"    {line.strip()}")
+    for line in output.splitlines():
+        print(f"    {line.strip()}")
 
     if code == 0:
         print("  ✓ Training smoke test passed")
@@ -522,12 +525,12 @@ def phase_regression_check(baseline_path: str | None) -> bool:
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     try:
         branch = subprocess.check_output(
-            ["git", "branch", "--show-current"], cwd=str(PROJECT_DIR), text=True
+            ["git", "branch", "--show-current"], cwd=_PROJECT_STR, stdin=subprocess.DEVNULL, text=True
         ).strip().replace("/", "_")
     except Exception:
         branch = "unknown"
     dest = REPORTS_DIR / f"report_{branch}_{timestamp}.json"
-    shutil.copy2(report_path, dest)
+    shutil.copyfile(report_path, dest)
     print(f"  Report saved: {dest.name}")
 
     # Find baseline
@@ -538,7 +541,7 @@ def phase_regression_check(baseline_path: str | None) -> bool:
 
     if not baseline.exists():
         print("  ⚠ No baseline found, saving current as baseline")
-        shutil.copy2(dest, REPORTS_DIR / "baseline.json")
+        shutil.copyfile(dest, REPORTS_DIR / "baseline.json")
         return True
 
     # Compare
@@ -546,7 +549,7 @@ def phase_regression_check(baseline_path: str | None) -> bool:
         [sys.executable, str(COMPARE_SCRIPT), str(baseline), str(dest)],
         timeout=10, label="regression-check",
     )
-    for line in output.split("\n"):
+    for line in output.splitlines():
         if line.strip():
             print(f"    {line}")
 
@@ -571,6 +574,8 @@ def main():
     args = parser.parse_args()
 
     godot = find_godot(args.godot)
+    # Shared by every Godot phase; each appends its own --script
+    godot_cmd = [godot, "--headless", "--path", _PROJECT_STR]
 
     print("╔══════════════════════════════════════╗")
     print("║     Evolve PR Validator              ║")
@@ -602,21 +607,21 @@ def main():
         results["merge_conflicts"] = None
         print("\n  ⏭ Merge conflict check skipped")
 
-    # Phase 1: Unit tests (always run)
-    results["unit_tests"] = phase_unit_tests(godot)
+    # Phase 1: Unit tests (always run, and gate everything after)
+    results["unit_tests"] = phase_unit_tests(godot_cmd)
     if not results["unit_tests"]:
         print("\n❌ BLOCKED: Unit tests failed. Fix before merging.")
         sys.exit(1)
 
-    # Phase 2: Gameplay tests
-    results["gameplay_tests"] = phase_gameplay_tests(godot, quick=args.quick)
+    # Phases 2 & 3 run one after the other: both use the same user:// directory for their
+    # reports and metrics, and their wall-clock timeouts assume Godot has the CPU to itself
+    results["gameplay_tests"] = phase_gameplay_tests(godot_cmd, quick=args.quick)
     if not results["gameplay_tests"]:
         print("\n❌ BLOCKED: Gameplay tests failed. Gameplay regression detected.")
         sys.exit(1)
 
-    # Phase 3: Training smoke test
     if not args.quick and not args.skip_training:
-        results["training_smoke"] = phase_training_smoke(godot)
+        results["training_smoke"] = phase_training_smoke(godot_cmd)
         if not results["training_smoke"]:
             print("\n❌ BLOCKED: Training mode broken. AI training pipeline regression.")
             sys.exit(1)
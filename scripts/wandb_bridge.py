@@ -12,14 +12,20 @@ and logs each generation's metrics to W&B.
 """
 
 import argparse
+import json
 import os
 import sys
+import threading
+import time
+from pathlib import Path
 
-import wandb
+# Godot process and metrics-watching helpers, shared with the overnight agent
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "overnight-agent"))
+from godot_runner import read_metrics_if_changed, watch_metrics  # noqa: E402
 
 # Import shared utilities
 sys.path.insert(0, os.path.expanduser("~/shared-evolve-utils"))
-from godot_wandb import godot_user_dir, poll_metrics, read_metrics  # noqa: E402
+from godot_wandb import godot_user_dir  # noqa: E402
 
 EVOLVE_LOG_KEYS = [
     "generation", "best_fitness", "avg_fitness", "min_fitness",
@@ -30,9 +36,65 @@ EVOLVE_LOG_KEYS = [
     "enemy_all_time_best", "hof_size",
 ]
 
+# Without watchdog: poll fast right after a write, backing off while Godot is mid-generation
+MIN_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 8.0
+MAX_STALE_SECONDS = 600  # stop after 10 minutes without a new generation
+
+
+def follow_metrics(run, metrics_path: Path) -> dict | None:
+    """
+    Log each generation Godot writes to `metrics_path` until none arrive for
+    MAX_STALE_SECONDS or Ctrl+C. Returns the last generation's metrics.
+    """
+    last_gen = None
+    last_data = None
+    last_stat = None  # (st_mtime_ns, st_size) of the last parsed metrics file
+    last_progress = time.monotonic()
+    poll_interval = MIN_POLL_INTERVAL
+
+    # Wake on metrics writes; the wait timeout only drives the staleness cutoff
+    changed = threading.Event()
+    observer = watch_metrics(metrics_path, changed)
+    try:
+        while True:
+            stale_for = time.monotonic() - last_progress
+            if stale_for >= MAX_STALE_SECONDS:
+                print(f"\nNo new generation for {MAX_STALE_SECONDS // 60} minutes, stopping")
+                break
+            changed.clear()
+            # One stat per wake; only re-parse when Godot has actually rewritten the file
+            try:
+                data, last_stat = read_metrics_if_changed(metrics_path, last_stat)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = None  # Training hasn't started yet, or caught mid-write
+            gen = data.get("generation") if data else None
+            # Any change counts: a lower generation means training was restarted in Godot
+            if gen is not None and gen != last_gen:
+                last_gen = gen
+                last_data = data
+                last_progress = time.monotonic()
+                run.log({k: data[k] for k in EVOLVE_LOG_KEYS if k in data})
+                print(f"  Gen {gen}: best={data.get('best_fitness', 0):.1f}, avg={data.get('avg_fitness', 0):.1f}")
+            if observer is not None:
+                changed.wait(MAX_STALE_SECONDS - stale_for)
+            else:
+                poll_interval = MIN_POLL_INTERVAL if data is not None else min(poll_interval * 2, MAX_POLL_INTERVAL)
+                changed.wait(poll_interval)
+    except KeyboardInterrupt:
+        print("\nStopped by user")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+    return last_data
+
 
 def run_bridge(project_name: str, run_name: str = None):
     """Watch metrics file and log to W&B."""
+    # Imported here so `--help` doesn't pay wandb's import time
+    import wandb
+
     metrics_path = godot_user_dir("evolve") / "metrics.json"
 
     run = wandb.init(
@@ -45,19 +107,9 @@ def run_bridge(project_name: str, run_name: str = None):
     print("Start training in Godot (press T), metrics will be logged here.")
     print("Press Ctrl+C to stop.\n")
 
-    try:
-        poll_metrics(
-            run, metrics_path,
-            max_generations=9999,  # Bridge runs until interrupted
-            poll_interval=2.0,
-            max_stale=300,  # 10 minutes tolerance
-            log_keys=EVOLVE_LOG_KEYS,
-        )
-    except KeyboardInterrupt:
-        print("\nStopped by user")
+    final = follow_metrics(run, metrics_path)  # Runs until interrupted or Godot goes quiet
 
-    # Final summary
-    final = read_metrics(metrics_path)
+    # Final summary, from the last generation already parsed
     if final:
         wandb.summary["final_generation"] = final.get("generation", 0)
         wandb.summary["final_best_fitness"] = final.get("all_time_best", 0)
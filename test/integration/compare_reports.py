@@ -9,8 +9,17 @@ Thresholds (percentage change that triggers a regression flag):
   Performance metrics (frame time, memory): >30% increase
   Pass/fail: any previously-passing scenario that now fails
 """
+import argparse
 import json
 import sys
+from operator import itemgetter
+from pathlib import Path
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json parses the same bytes
+    _json_loads = json.loads
 
 # Percentage thresholds: negative = drop is bad, positive = increase is bad
 GAMEPLAY_THRESHOLDS = {
@@ -28,78 +37,90 @@ PERFORMANCE_THRESHOLDS = {
     "peak_memory_mb": 30.0,   # >30% more memory = regression
 }
 
+_EMPTY: dict = {}  # shared default for absent sections; never mutated
+
 
 def load_report(path):
-    with open(path) as f:
-        return json.load(f)
+    return _json_loads(Path(path).read_bytes())
 
 
-def compare(baseline, current, strict=False):
-    regressions = []
-    improvements = []
-    warnings = []
+FINDING_SECTIONS = (
+    ("regression", "⚠️  REGRESSIONS DETECTED:"),
+    ("warning", "ℹ️  Warnings:"),
+    ("improvement", "🎉 Improvements:"),
+)
+
 
+def _sorted_unique(scenarios):
+    """Sort scenarios by name; a repeated name keeps only its last entry, as a name->scenario dict would."""
+    ordered = sorted(scenarios, key=itemgetter("name"))  # stable, so repeats stay in report order
+    return [s for s, nxt in zip(ordered, ordered[1:] + [None], strict=True)
+            if nxt is None or nxt["name"] != s["name"]]
+
+
+def iter_findings(baseline, current):
+    """Yield (kind, message) for each difference, kind being a FINDING_SECTIONS key."""
     # Summary-level checks
-    bs, cs = baseline.get("summary", {}), current.get("summary", {})
+    bs, cs = baseline.get("summary") or _EMPTY, current.get("summary") or _EMPTY
     if cs.get("failed", 0) > bs.get("failed", 0):
-        regressions.append(
-            f"More failures: {bs.get('failed', 0)} → {cs.get('failed', 0)}"
-        )
-
-    # Build scenario maps
-    b_scenarios = {s["name"]: s for s in baseline.get("scenarios", [])}
-    c_scenarios = {s["name"]: s for s in current.get("scenarios", [])}
-
-    # Check for missing scenarios
-    for name in b_scenarios:
-        if name not in c_scenarios:
-            regressions.append(f"{name}: MISSING from current report")
-
-    # Compare each scenario
-    for name, curr in c_scenarios.items():
-        base = b_scenarios.get(name)
-        if not base:
-            warnings.append(f"{name}: NEW scenario (no baseline)")
+        yield "regression", f"More failures: {bs.get('failed', 0)} → {cs.get('failed', 0)}"
+
+    # Merge-join the two scenario lists by name instead of building a dict for each
+    b_scenarios = _sorted_unique(baseline.get("scenarios", []))
+    c_scenarios = _sorted_unique(current.get("scenarios", []))
+    i = j = 0
+    while i < len(b_scenarios) or j < len(c_scenarios):
+        if j == len(c_scenarios) or (i < len(b_scenarios) and b_scenarios[i]["name"] < c_scenarios[j]["name"]):
+            yield "regression", f"{b_scenarios[i]['name']}: MISSING from current report"
+            i += 1
+            continue
+        curr = c_scenarios[j]
+        name = curr["name"]
+        j += 1
+        if i == len(b_scenarios) or name < b_scenarios[i]["name"]:
+            yield "warning", f"{name}: NEW scenario (no baseline)"
             continue
+        base = b_scenarios[i]
+        i += 1
 
         # Pass/fail regression
         if base.get("passed") and not curr.get("passed"):
-            regressions.append(f"{name}: PASS → FAIL")
+            yield "regression", f"{name}: PASS → FAIL"
             for e in curr.get("errors", []):
-                regressions.append(f"  → {e}")
+                yield "regression", f"  → {e}"
             continue  # Don't check metrics for failing scenarios
 
         # Gameplay metric regressions
-        bg = base.get("gameplay", {})
-        cg = curr.get("gameplay", {})
+        bg = base.get("gameplay") or _EMPTY
+        cg = curr.get("gameplay") or _EMPTY
         for metric, threshold in GAMEPLAY_THRESHOLDS.items():
             bv = bg.get(metric, 0)
             cv = cg.get(metric, 0)
             if bv > 0:
                 pct = ((cv - bv) / bv) * 100
                 if pct < threshold:
-                    regressions.append(
+                    yield "regression", (
                         f"{name}/{metric}: {bv:.0f} → {cv:.0f} ({pct:+.1f}%, threshold: {threshold}%)"
                     )
                 elif pct > abs(threshold) * 2:
-                    improvements.append(
-                        f"{name}/{metric}: {bv:.0f} → {cv:.0f} ({pct:+.1f}%)"
-                    )
+                    yield "improvement", f"{name}/{metric}: {bv:.0f} → {cv:.0f} ({pct:+.1f}%)"
 
         # Performance metric regressions
-        bp = base.get("performance", {})
-        cp = curr.get("performance", {})
+        bp = base.get("performance") or _EMPTY
+        cp = curr.get("performance") or _EMPTY
         for metric, threshold in PERFORMANCE_THRESHOLDS.items():
             bv = bp.get(metric, 0)
             cv = cp.get(metric, 0)
             if bv > 0:
                 pct = ((cv - bv) / bv) * 100
                 if pct > threshold:
-                    regressions.append(
+                    yield "regression", (
                         f"{name}/{metric}: {bv:.1f} → {cv:.1f} ({pct:+.1f}%, threshold: +{threshold}%)"
                     )
 
-    # Print results
+
+def compare(baseline, current, strict=False):
+    bs, cs = baseline.get("summary") or _EMPTY, current.get("summary") or _EMPTY
     print("=" * 50)
     print("  REGRESSION COMPARISON REPORT")
     print("=" * 50)
@@ -107,45 +128,40 @@ def compare(baseline, current, strict=False):
     print(f"Current:  {cs.get('passed', '?')}/{cs.get('total', '?')} passed")
     print()
 
-    if regressions:
-        print("⚠️  REGRESSIONS DETECTED:")
-        for r in regressions:
-            print(f"  {r}")
-        print()
-
-    if warnings:
-        print("ℹ️  Warnings:")
-        for w in warnings:
-            print(f"  {w}")
-        print()
-
-    if improvements:
-        print("🎉 Improvements:")
-        for i in improvements:
-            print(f"  {i}")
-        print()
-
-    if not regressions:
+    # One pass over the reports. Sections print in a fixed order, not the order lines are
+    # found in, so the messages are bucketed by kind rather than printed as they stream in
+    findings: dict[str, list[str]] = {section: [] for section, _ in FINDING_SECTIONS}
+    for kind, msg in iter_findings(baseline, current):
+        findings[kind].append(msg)
+
+    for section, heading in FINDING_SECTIONS:
+        if findings[section]:
+            print(heading)
+            for msg in findings[section]:
+                print(f"  {msg}")
+            print()
+
+    if not findings["regression"]:
         print("✅ No regressions detected")
 
-    has_regressions = len(regressions) > 0
-    if strict and warnings:
+    has_regressions = len(findings["regression"]) > 0
+    if strict and findings["warning"]:
         has_regressions = True
 
     return has_regressions
 
 
 def main():
-    strict = "--strict" in sys.argv
-    args = [a for a in sys.argv[1:] if not a.startswith("--")]
-
-    if len(args) != 2:
-        print(f"Usage: {sys.argv[0]} <baseline.json> <current.json> [--strict]")
-        sys.exit(2)
-
-    baseline = load_report(args[0])
-    current = load_report(args[1])
-    has_regressions = compare(baseline, current, strict=strict)
+    # argparse exits with status 2 on bad usage, matching the documented exit code
+    parser = argparse.ArgumentParser(description="Compare two gameplay test reports")
+    parser.add_argument("baseline", help="Baseline report JSON")
+    parser.add_argument("current", help="Current report JSON")
+    parser.add_argument("--strict", action="store_true", help="Treat warnings as regressions")
+    args = parser.parse_args()
+
+    baseline = load_report(args.baseline)
+    current = load_report(args.current)
+    has_regressions = compare(baseline, current, strict=args.strict)
     sys.exit(1 if has_regressions else 0)
 
 
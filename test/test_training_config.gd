@@ -14,6 +14,7 @@ func run_tests() -> void:
     _test("load_from_sweep_worker_id_empty", _test_load_from_sweep_worker_id_empty)
     _test("get_metrics_path_default", _test_get_metrics_path_default)
     _test("get_metrics_path_with_worker", _test_get_metrics_path_with_worker)
+    _test("get_metrics_stream_path", _test_get_metrics_stream_path)
     _test("get_raw_key_missing", _test_get_raw_missing_key)
 
 
@@ -124,6 +125,18 @@ func _test_get_metrics_path_with_worker() -> void:
     )
 
 
+func _test_get_metrics_stream_path() -> void:
+    var cfg = TrainingConfigScript.new()
+    assert_false(cfg.metrics_stream, "Metrics stream should be off by default")
+    assert_eq(cfg.get_metrics_stream_path(), "user://metrics.ndjson", "Default stream path")
+    cfg.worker_id = "worker_42"
+    assert_eq(
+        cfg.get_metrics_stream_path(),
+        "user://metrics_worker_42.ndjson",
+        "Worker stream path should include worker ID"
+    )
+
+
 func _test_get_raw_missing_key() -> void:
     var cfg = TrainingConfigScript.new()
     assert_null(cfg.get_raw("nonexistent_key"), "Missing key should return null")
@@ -8,8 +8,11 @@ Writes ~/.local/share/godot/app_userdata/Evolve/tui_commands.json  (read by Godo
 Run: python3 ~/evolve/tui/evolve_tui.py
 """
 
+import asyncio
 import json
+import os
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
 from rich.text import Text
@@ -18,6 +21,16 @@ from textual.binding import Binding
 from textual.containers import Horizontal, Vertical
 from textual.widgets import DataTable, Footer, RichLog, Static
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:  # orjson is optional; stdlib json reads and writes the same JSON
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 # ── paths ────────────────────────────────────────────────────────────────────
 GODOT_USER = Path.home() / ".local/share/godot/app_userdata/Evolve"
 ARENA_STATES = GODOT_USER / "arena_states.json"
@@ -25,38 +38,58 @@ TUI_COMMANDS = GODOT_USER / "tui_commands.json"
 
 POLL_INTERVAL = 0.5   # seconds between state refreshes
 SPARKLINE_BARS = "▁▂▃▄▅▆▇█"
+ARENA_COLUMNS = ("arena", "ind", "score", "status", "time")  # DataTable column keys
+HEADER_TEMPLATE = (
+    "[bold cyan]EVOLVE[/]  [yellow]{mode}[/]  Gen:[bold]{gen}[/]  Best:[bold green]{best}[/]  "
+    "Speed:[bold]{speed:.0f}×[/]  [dim]{stage}[/]  [dim]{ts}[/]"
+)
+# Status cells are never modified once built, so every row can share these
+STATUS_CELLS = {
+    "done":  Text("○ DONE", style="dim"),
+    "dead":  Text("✗ DEAD", style="red"),
+    "alive": Text("● ALIVE", style="green"),
+}
 
 
 # ── helpers ──────────────────────────────────────────────────────────────────
 
 def sparkline(values: list[float], width: int = 20) -> str:
-    if not values:
+    # History only grows once per generation, so most polls redraw the same window
+    return _sparkline(tuple(values[-width:]), width)
+
+
+@lru_cache(maxsize=128)
+def _sparkline(window: tuple[float, ...], width: int) -> str:
+    if not window:
         return "─" * width
-    mn, mx = min(values), max(values)
+    # Scale to the visible window only, in one pass per bound
+    mn, mx = min(window), max(window)
     rng = mx - mn or 1.0
-    bars = SPARKLINE_BARS
-    result = ""
-    for v in values[-width:]:
-        idx = int((v - mn) / rng * (len(bars) - 1))
-        result += bars[idx]
-    return result.ljust(width, "─")
+    top = len(SPARKLINE_BARS) - 1
+    return "".join([SPARKLINE_BARS[int((v - mn) / rng * top)] for v in window]).ljust(width, "─")
 
 
 def fmt_score(v: float) -> str:
     return f"{int(v):,}"
 
 
-def send_command(action: str, **kwargs) -> None:
-    cmd = {"action": action, **kwargs}
-    TUI_COMMANDS.write_text(json.dumps(cmd))
+def arena_cell(column: str, value):
+    """Render one arena-table cell from its plain value (see EvolveTUI._refresh_ui)."""
+    if column == "score":
+        score, done = value
+        return Text(score, style="bold" if not done else "dim")
+    if column == "status":
+        return STATUS_CELLS[value]
+    return value
 
 
-def load_state() -> dict | None:
-    try:
-        text = ARENA_STATES.read_text()
-        return json.loads(text)
-    except Exception:
-        return None
+def send_command(action: str, **kwargs) -> None:
+    cmd = {"action": action, **kwargs}
+    # Written beside the real file and renamed into place: Godot polls every frame
+    # and would otherwise be able to read (and delete) a half-written command
+    tmp = TUI_COMMANDS.with_suffix(".tmp")
+    tmp.write_bytes(_json_dumps(cmd))
+    os.replace(tmp, TUI_COMMANDS)
 
 
 # ── widgets ──────────────────────────────────────────────────────────────────
@@ -73,25 +106,24 @@ class HeaderBar(Static):
     }
     """
 
+    _markup: str = ""  # last markup passed to update()
+
     def update_state(self, state: dict | None) -> None:
         if state is None:
-            self.update("[dim]◌  Waiting for Godot...[/]")
-            return
-        mode    = state.get("mode", "?")
-        gen     = state.get("generation", 0)
-        best    = fmt_score(state.get("all_time_best", 0))
-        speed   = state.get("time_scale", 1.0)
-        stage   = state.get("curriculum_label", "")
-        ts      = datetime.now().strftime("%H:%M:%S")
-        self.update(
-            f"[bold cyan]EVOLVE[/]  "
-            f"[yellow]{mode}[/]  "
-            f"Gen:[bold]{gen}[/]  "
-            f"Best:[bold green]{best}[/]  "
-            f"Speed:[bold]{speed:.0f}×[/]  "
-            f"[dim]{stage}[/]  "
-            f"[dim]{ts}[/]"
-        )
+            markup = "[dim]◌  Waiting for Godot...[/]"
+        else:
+            markup = HEADER_TEMPLATE.format(
+                mode=state.get("mode", "?"),
+                gen=state.get("generation", 0),
+                best=fmt_score(state.get("all_time_best", 0)),
+                speed=state.get("time_scale", 1.0),
+                stage=state.get("curriculum_label", ""),
+                ts=datetime.now().strftime("%H:%M:%S"),
+            )
+        # The clock ticks once a second but polls come twice as often; only re-render on change
+        if markup != self._markup:
+            self._markup = markup
+            self.update(markup)
 
 
 class StatsPanel(Static):
@@ -187,6 +219,13 @@ class EvolveTUI(App):
         super().__init__()
         self._state: dict | None = None
         self._focus_idx: int = 0
+        # Plain values last shown per arena id, and the label order, so polls only touch what changed
+        self._arena_rows: dict[int, tuple] = {}
+        self._arena_order: list[str] = []
+        # Last parsed arena_states.json and its (mtime, size), so unchanged files aren't re-read
+        self._last_state: dict | None = None
+        self._last_stat: tuple[int, int] | None = None
+        self._last_log_ts: float = 0.0  # timestamp of the newest Godot log entry written
 
     def compose(self) -> ComposeResult:
         yield HeaderBar(id="header-bar")
@@ -199,14 +238,40 @@ class EvolveTUI(App):
         yield Footer()
 
     def on_mount(self) -> None:
+        # Widgets are looked up once here rather than with a DOM query on every poll
+        self._header = self.query_one("#header-bar", HeaderBar)
+        self._stats = self.query_one("#stats", StatsPanel)
+        self._table = self.query_one("#arena-table", DataTable)
+        self._log_view = self.query_one("#log", RichLog)
         # Set up arena table columns
-        table: DataTable = self.query_one("#arena-table", DataTable)
-        table.add_columns("Arena", "Ind", "Score", "Status", "Time")
-        # Start polling
+        for key in ARENA_COLUMNS:
+            self._table.add_column(key.capitalize(), key=key)
+        # Draw the no-data state once, then poll
+        self._refresh_ui()
         self.set_interval(POLL_INTERVAL, self._poll)
 
-    def _poll(self) -> None:
-        new_state = load_state()
+    def load_state(self) -> dict | None:
+        try:
+            st = ARENA_STATES.stat()
+        except OSError:
+            return None  # Godot isn't running (or hasn't written yet)
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key != self._last_stat:
+            try:
+                self._last_state = _json_loads(ARENA_STATES.read_bytes())
+            except (OSError, ValueError):
+                # Godot rewrites the file in place; a torn read keeps the last state until the next poll
+                return self._last_state
+            self._last_stat = stat_key
+        return self._last_state
+
+    async def _poll(self) -> None:
+        # Disk reads run in a worker thread so a slow read never holds up key handling
+        new_state = await asyncio.to_thread(self.load_state)
+        if new_state is self._state:
+            # load_state hands back the same dict while the file is unchanged; only the clock moved
+            self._header.update_state(new_state)
+            return
         self._state = new_state
         self._refresh_ui()
 
@@ -214,86 +279,106 @@ class EvolveTUI(App):
         state = self._state
 
         # Header
-        self.query_one("#header-bar", HeaderBar).update_state(state)
+        self._header.update_state(state)
 
         # Stats
-        self.query_one("#stats", StatsPanel).update_state(state)
+        self._stats.update_state(state)
 
         # Arena table
-        table: DataTable = self.query_one("#arena-table", DataTable)
-        table.clear()
-        if state:
-            arenas = sorted(
-                state.get("arenas", []),
-                key=lambda a: a.get("score", 0),
-                reverse=True,
-            )
-            for a in arenas:
-                aid       = a.get("id", 0)
-                ind       = a.get("individual", -1)
-                score     = a.get("score", 0.0)
-                done      = a.get("done", False)
-                alive     = a.get("alive", False)
-                elapsed   = a.get("time", 0.0)
-
-                label = f"A{aid+1:02d}"
-
-                if done:
-                    status = Text("○ DONE", style="dim")
-                elif not alive:
-                    status = Text("✗ DEAD", style="red")
-                else:
-                    status = Text("● ALIVE", style="green")
-
-                score_txt = Text(fmt_score(score), style="bold" if not done else "dim")
-                time_txt  = f"{elapsed:.0f}s"
-
-                table.add_row(label, str(ind), score_txt, status, time_txt)
+        # Rows are keyed by arena id and updated cell by cell; clearing and re-adding
+        # every row each poll redrew the whole table even when nothing had changed
+        table = self._table
+        arenas = sorted(
+            state.get("arenas", []),
+            key=lambda a: a.get("score", 0),
+            reverse=True,
+        ) if state else []
+        order: list[str] = []
+        for a in arenas:
+            aid       = a.get("id", 0)
+            ind       = a.get("individual", -1)
+            score     = a.get("score", 0.0)
+            done      = a.get("done", False)
+            alive     = a.get("alive", False)
+            elapsed   = a.get("time", 0.0)
+
+            label = f"A{aid+1:02d}"
+            status = "done" if done else "dead" if not alive else "alive"
+            # Plain values, one per column: rich's Text equality ignores style
+            row = (label, str(ind), (fmt_score(score), done), status, f"{elapsed:.0f}s")
+            order.append(label)
+
+            prev = self._arena_rows.get(aid)
+            if prev is None:
+                table.add_row(*(arena_cell(c, v) for c, v in zip(ARENA_COLUMNS, row, strict=True)), key=str(aid))
+            elif prev != row:
+                for column, old, new in zip(ARENA_COLUMNS, prev, row, strict=True):
+                    if old != new:
+                        table.update_cell(str(aid), column, arena_cell(column, new))
+            self._arena_rows[aid] = row
+
+        seen = {a.get("id", 0) for a in arenas}
+        for aid in self._arena_rows.keys() - seen:
+            table.remove_row(str(aid))
+            del self._arena_rows[aid]
+
+        if order != self._arena_order:
+            rank = {label: i for i, label in enumerate(order)}
+            table.sort("arena", key=rank.__getitem__)
+            self._arena_order = order
 
         # Log
-        log: RichLog = self.query_one("#log", RichLog)
+        log = self._log_view
         if state:
             entries = state.get("log", [])
-            # Only write new entries (track by count — simple approach)
-            for entry in entries[-8:]:
+            # Godot resends its whole rolling buffer; only write entries newer than the last one shown
+            start = len(entries)
+            while start and entries[start - 1].get("ts", 0) > self._last_log_ts:
+                start -= 1
+            for entry in entries[start:][-8:]:
                 ts  = datetime.fromtimestamp(entry.get("ts", 0)).strftime("%H:%M:%S")
                 msg = entry.get("msg", "")
                 log.write(f"[dim]{ts}[/]  {msg}")
+            if start < len(entries):
+                self._last_log_ts = entries[-1].get("ts", 0)
 
     # ── actions ──────────────────────────────────────────────────────────────
 
-    def action_cmd_train(self) -> None:
-        send_command("start_training")
+    async def action_cmd_train(self) -> None:
+        await self._send("start_training")
         self._log_local("→ start_training sent")
 
-    def action_cmd_play(self) -> None:
-        send_command("play_best")
+    async def action_cmd_play(self) -> None:
+        await self._send("play_best")
         self._log_local("→ play_best sent")
 
-    def action_cmd_speed_up(self) -> None:
-        send_command("speed_up")
+    async def action_cmd_speed_up(self) -> None:
+        await self._send("speed_up")
         self._log_local("→ speed_up sent")
 
-    def action_cmd_speed_down(self) -> None:
-        send_command("speed_down")
+    async def action_cmd_speed_down(self) -> None:
+        await self._send("speed_down")
         self._log_local("→ speed_down sent")
 
-    def action_cmd_focus(self) -> None:
+    async def action_cmd_focus(self) -> None:
         state = self._state
         if state:
             arenas = state.get("arenas", [])
             if arenas:
                 self._focus_idx = (self._focus_idx + 1) % len(arenas)
                 idx = arenas[self._focus_idx].get("id", 0)
-                send_command("focus_arena", index=idx)
+                await self._send("focus_arena", index=idx)
                 self._log_local(f"→ focus arena {idx}")
 
-    def action_cmd_unfocus(self) -> None:
-        send_command("exit_focus")
+    async def action_cmd_unfocus(self) -> None:
+        await self._send("exit_focus")
         self._log_local("→ exit_focus sent")
 
+    async def _send(self, action: str, **kwargs) -> None:
+        await asyncio.to_thread(send_command, action, **kwargs)
+
     def _log_local(self, msg: str) -> None:
-        log: RichLog = self.query_one("#log", RichLog)
+        log = self._log_view
         ts = datetime.now().strftime("%H:%M:%S")
         log.write(f"[dim]{ts}[/]  [italic cyan]{msg}[/]")
 